@@ -0,0 +1,289 @@
+"""
+Batch CLI - Headless Processing of Many Exported Designs
+
+Pushes a directory of exported designs through analysis, LayoutGenerator,
+ConstraintGenerator and BatchExecutor without the UI, for regression tests
+and overnight runs:
+- One design per folder containing schematic_info.json and/or pcb_info.json
+- Designs run in parallel on a process pool
+- Each design gets its own result folder (analysis, layout, constraints,
+  Altium scripts, result.json with per-stage timings)
+- summary.json / summary.md report every design and its stage timings
+- Interrupted runs resume: designs whose result.json matches the current
+  inputs are skipped
+
+Usage:
+    python batch_cli.py exports/ -o results/ -j 4
+    python batch_cli.py exports/ -o results/ --llm-blocks   # include LLM block detection
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional
+from config import LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE
+import logging
+
+logger = logging.getLogger("batch_cli")
+
+INPUT_FILES = ("schematic_info.json", "pcb_info.json")
+RESULT_FILE = "result.json"
+
+# Per-process LLM client (only with --llm-blocks), set by _init_worker
+_llm_client = None
+
+
+def find_designs(input_dir: Path) -> List[Path]:
+    """Folders under input_dir (including itself) holding exported design data"""
+    designs = {path.parent for name in INPUT_FILES for path in input_dir.rglob(name)}
+    return sorted(designs)
+
+
+def input_fingerprint(design_dir: Path) -> str:
+    """Hash of the input files' names, sizes and modification times"""
+    digest = hashlib.sha256()
+    for name in INPUT_FILES:
+        path = design_dir / name
+        if path.exists():
+            stat = path.stat()
+            digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, data: Any):
+    """Write atomically so an interrupted run never leaves a half-written result"""
+    temp = path.with_suffix(path.suffix + ".tmp")
+    temp.write_text(json.dumps(data, indent=2, default=str), encoding="utf-8")
+    os.replace(temp, path)
+
+
+def is_complete(design_dir: Path, out_dir: Path) -> bool:
+    """Whether a previous run already processed these exact inputs"""
+    try:
+        result = _read_json(out_dir / RESULT_FILE)
+    except (OSError, json.JSONDecodeError):
+        return False
+    return bool(result) and result.get("status") == "ok" \
+        and result.get("fingerprint") == input_fingerprint(design_dir)
+
+
+def _init_worker(llm_blocks: bool, workers: int, use_cache: bool = True):
+    """Process pool initializer: logging, results cache and (optionally) a rate-shared LLM client"""
+    global _llm_client
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s")
+    if not use_cache:
+        from results_cache import ResultsCache, set_results_cache
+        set_results_cache(ResultsCache(cache_dir=None))
+    if llm_blocks:
+        from llm_client import LLMClient
+        from llm_scheduler import LLMScheduler
+        # Provider limits are per account - split them across the workers
+        scheduler = LLMScheduler(requests_per_minute=max(1, LLM_REQUESTS_PER_MINUTE // workers),
+                                 tokens_per_minute=max(1, LLM_TOKENS_PER_MINUTE // workers))
+        _llm_client = LLMClient(scheduler=scheduler)
+
+
+def process_design(design_dir: str, out_dir: str, llm_blocks: bool = False) -> Dict[str, Any]:
+    """
+    Run one design through analysis, layout, constraints and script generation.
+
+    Returns:
+        The design's result record (also written to out_dir/result.json)
+    """
+    from design_analyzer import DesignAnalyzer, ANALYSIS_SECTIONS
+    from layout_generator import LayoutGenerator
+    from constraint_generator import ConstraintGenerator
+    from batch_executor import BatchExecutor
+    from llm_scheduler import RequestPriority
+    from stage_graph import StageGraph
+    from results_cache import canonical_hash, get_results_cache
+
+    design_dir, out_dir = Path(design_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    result = {"design": out_dir.name, "fingerprint": input_fingerprint(design_dir), "status": "ok"}
+    start = time.perf_counter()
+
+    try:
+        load_start = time.perf_counter()
+        schematic = _read_json(design_dir / "schematic_info.json") or {}
+        pcb = _read_json(design_dir / "pcb_info.json") or {}
+        load_s = time.perf_counter() - load_start
+
+        components = schematic.get("components") or pcb.get("components") or []
+        nets = schematic.get("nets") or schematic.get("wires") or pcb.get("nets") or []
+        board = pcb.get("board_size", {})
+
+        cache = get_results_cache()
+        analyzer = DesignAnalyzer(_llm_client)
+        analyzer.priority = RequestPriority.BATCH
+        analyzer.load_schematic_data(schematic or {"components": components, "nets": nets})
+        sections = ANALYSIS_SECTIONS["constraints"] + ("component_summary",)
+        if llm_blocks:
+            sections += ("functional_blocks",)
+
+        layout = LayoutGenerator(board.get("width_mm", 100.0), board.get("height_mm", 80.0))
+        constraints = ConstraintGenerator()
+        executor = BatchExecutor(output_dir=str(out_dir))
+
+        def analysis():
+            data = analyzer.analyze_schematic()
+            return data.to_dict(sections) if hasattr(data, "to_dict") else data
+
+        def placement(analysis_data):
+            layout.generate_layout(components, analysis_data.get("functional_blocks"), cache=cache)
+            layout.generate_constraints(analysis_data.get("signal_analysis"))
+            (out_dir / "layout.json").write_text(layout.export_to_json(), encoding="utf-8")
+            return layout.generate_placement_commands()
+
+        def rules():
+            def generate():
+                classified = constraints.analyze_nets([n for n in nets if isinstance(n, dict)])
+                constraints.generate_net_classes(classified)
+                constraints.generate_rules(classified)
+                return {"json": constraints.export_rules_json(),
+                        "script": constraints.generate_altium_rules_script(),
+                        "summary": constraints.get_summary()}
+            key = canonical_hash(nets, constraints.defaults)
+            generated = cache.get_or_compute("constraints", key, generate)
+            (out_dir / "constraints.json").write_text(generated["json"], encoding="utf-8")
+            (out_dir / "design_rules.pas").write_text(generated["script"], encoding="utf-8")
+            return generated["summary"]
+
+        def script(commands):
+            executor.add_commands(commands)
+            return str(executor.save_batch_script())
+
+        graph = StageGraph()
+        graph.add("analysis", analysis)
+        graph.add("layout", placement, deps=("analysis",))
+        graph.add("constraints", rules)
+        graph.add("script", script, deps=("layout",))
+        stages = graph.run()
+
+        _write_json(out_dir / "analysis.json", stages["analysis"])
+        result.update({
+            "components": len(components),
+            "nets": len(nets),
+            "placements": len(layout.placements),
+            "layout_constraints": len(layout.constraints),
+            "rules": stages["constraints"],
+            "script": stages["script"],
+            "timings_s": {"load": round(load_s, 4), **{k: round(v, 4) for k, v in graph.timings.items()}},
+        })
+    except Exception as e:
+        result.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+    result["total_s"] = round(time.perf_counter() - start, 4)
+    _write_json(out_dir / RESULT_FILE, result)
+    return result
+
+
+def write_summary(output_dir: Path, results: List[Dict[str, Any]], wall_s: float):
+    """summary.json plus a markdown table of per-design stage timings"""
+    stages = sorted({stage for r in results for stage in r.get("timings_s", {})})
+    ok = [r for r in results if r.get("status") == "ok"]
+    summary = {
+        "designs": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "skipped": sum(1 for r in results if r.get("skipped")),
+        "wall_s": round(wall_s, 2),
+        "stage_totals_s": {s: round(sum(r.get("timings_s", {}).get(s, 0) for r in ok), 4) for s in stages},
+        "results": results,
+    }
+    _write_json(output_dir / "summary.json", summary)
+
+    lines = [
+        "# Batch Summary",
+        "",
+        f"{summary['succeeded']}/{summary['designs']} designs succeeded "
+        f"({summary['skipped']} resumed from a previous run) in {summary['wall_s']}s",
+        "",
+        "| Design | Status | Components | " + " | ".join(f"{s} (s)" for s in stages) + " | Total (s) |",
+        "|" + "---|" * (len(stages) + 4),
+    ]
+    for r in results:
+        timings = r.get("timings_s", {})
+        status = r.get("status", "?") + (" (resumed)" if r.get("skipped") else "")
+        if r.get("error"):
+            status += f": {r['error']}"
+        lines.append(f"| {r.get('design')} | {status} | {r.get('components', '')} | "
+                     + " | ".join(str(timings.get(s, "")) for s in stages)
+                     + f" | {r.get('total_s', '')} |")
+    (output_dir / "summary.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run exported designs through analysis, layout and constraints.")
+    parser.add_argument("input_dir", help="Folder of exported designs (schematic_info.json / pcb_info.json)")
+    parser.add_argument("-o", "--output-dir", default="batch_results", help="Where per-design results are written")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 2, help="Worker processes")
+    parser.add_argument("--llm-blocks", action="store_true", help="Include LLM functional block detection")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocess designs that already have results")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute instead of reusing cached results")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    input_dir, output_dir = Path(args.input_dir), Path(args.output_dir)
+    designs = find_designs(input_dir)
+    if not designs:
+        logger.error(f"No schematic_info.json / pcb_info.json found under {input_dir}")
+        return 1
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # One result folder per design, named after its path under input_dir
+    targets = {design: output_dir / ("__".join(design.relative_to(input_dir).parts) or input_dir.resolve().name)
+               for design in designs}
+
+    results: List[Dict[str, Any]] = []
+    pending = []
+    for design, out in targets.items():
+        if not args.no_resume and is_complete(design, out):
+            results.append({**_read_json(out / RESULT_FILE), "skipped": True})
+        else:
+            pending.append(design)
+    logger.info(f"{len(designs)} designs, {len(designs) - len(pending)} already done, {len(pending)} to process")
+
+    start = time.perf_counter()
+    workers = max(1, min(args.jobs, len(pending) or 1))
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(args.llm_blocks, workers, not args.no_cache))
+    futures = {pool.submit(process_design, str(d), str(targets[d]), args.llm_blocks): d for d in pending}
+    try:
+        for future in as_completed(futures):
+            design = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # Worker crashed
+                result = {"design": targets[design].name, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            results.append(result)
+            logger.info(f"[{len(results)}/{len(designs)}] {result['design']}: {result['status']} "
+                        f"({result.get('total_s', 0):.2f}s)")
+    except KeyboardInterrupt:
+        logger.warning("Interrupted - finished designs are kept; rerun to resume")
+        for future in futures:
+            future.cancel()
+        return 130
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        results.sort(key=lambda r: r.get("design", ""))
+        write_summary(output_dir, results, time.perf_counter() - start)
+
+    failed = sum(1 for r in results if r.get("status") != "ok")
+    logger.info(f"Done: {len(results) - failed} ok, {failed} failed - see {output_dir / 'summary.md'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
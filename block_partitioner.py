@@ -0,0 +1,265 @@
+"""
+Block Partitioner - Connectivity Clusters for Functional Block Detection
+
+Splits a schematic into component groups small enough for one LLM call each,
+so functional block detection covers every component on large boards:
+- Components sharing a signal net are clustered; power, ground and very
+  high fan-out nets are ignored because they connect everything
+- Parts tied only to supplies (decoupling caps, pull-ups to a rail) join the
+  cluster of the nearest connected part on the schematic sheet
+- Clusters are packed into batches under a token budget; oversized clusters
+  are split in connectivity (BFS) order so neighbours stay together
+- merge_blocks() reconciles the per-batch answers into one block list that
+  assigns every component exactly once
+
+Connectivity comes from component pins (schematic export) and/or nets'
+connected_components (PCB export).
+"""
+import re
+from collections import Counter, OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from config import BLOCK_NET_MAX_FANOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Net name patterns of supply rails (also used to classify signals)
+POWER_NET_PATTERNS = ("VCC", "VDD", "3V3", "5V", "12V", "VBAT", "+V")
+GROUND_NET_PATTERNS = ("GND", "VSS", "GROUND", "AGND", "DGND")
+
+OTHER_BLOCK_NAME = "Other Components"
+
+
+def is_supply_net(name: str) -> bool:
+    """Power or ground net, judged by name"""
+    upper = (name or "").upper()
+    return any(p in upper for p in POWER_NET_PATTERNS + GROUND_NET_PATTERNS)
+
+
+def designator_of(component: Dict) -> str:
+    """Reference designator (schematic exports use "designator", PCB exports "name")"""
+    return str(component.get("designator") or component.get("name") or "")
+
+
+class ConnectivityGraph:
+    """
+    Components connected by signal nets.
+
+    Usage:
+        graph = ConnectivityGraph(components, nets)
+        for cluster in graph.clusters():
+            ...
+    """
+
+    def __init__(self, components: List[Dict], nets: List[Dict], max_fanout: int = BLOCK_NET_MAX_FANOUT):
+        self.designators: List[str] = []
+        self._index: Dict[str, int] = {}
+        locations: Dict[str, Tuple[float, float]] = {}
+        for comp in components:
+            designator = designator_of(comp)
+            if not designator or designator in self._index:
+                continue
+            self._index[designator] = len(self.designators)
+            self.designators.append(designator)
+            location = comp.get("location") or {}
+            if location.get("x") or location.get("y"):
+                locations[designator] = (float(location.get("x", 0)), float(location.get("y", 0)))
+
+        # Net membership from component pins and from PCB nets
+        members: Dict[str, Set[str]] = {}
+        for comp in components:
+            designator = designator_of(comp)
+            for pin in comp.get("pins") or []:
+                if isinstance(pin, dict) and pin.get("net"):
+                    members.setdefault(pin["net"], set()).add(designator)
+        for net in nets:
+            if isinstance(net, dict) and net.get("connected_components"):
+                name = net.get("name") or net.get("net_name") or ""
+                members.setdefault(name, set()).update(str(c) for c in net["connected_components"])
+
+        # Signal nets only: supplies and nets wider than max_fanout tie unrelated parts together
+        self.members: Dict[str, List[str]] = {}
+        for name, designators in members.items():
+            known = sorted((d for d in designators if d in self._index), key=self._index.get)
+            if len(known) >= 2 and len(known) <= max_fanout and not is_supply_net(name):
+                self.members[name] = known
+        self._neighbours: Dict[str, Set[str]] = {d: set() for d in self.designators}
+        for designators in self.members.values():
+            for designator in designators:
+                self._neighbours[designator].update(designators)
+        for designator, neighbours in self._neighbours.items():
+            neighbours.discard(designator)
+
+        # Parts without signal connections belong with the nearest connected part
+        self.anchors: Dict[str, str] = {}
+        connected = [d for d in self.designators if self._neighbours[d] and d in locations]
+        for designator in self.designators:
+            if self._neighbours[designator] or designator not in locations or not connected:
+                continue
+            x, y = locations[designator]
+            self.anchors[designator] = min(connected, key=lambda d: (
+                (locations[d][0] - x) ** 2 + (locations[d][1] - y) ** 2, self._index[d]))
+
+    def neighbours(self, designator: str) -> List[str]:
+        """Signal-net neighbours in component order"""
+        return sorted(self._neighbours.get(designator, ()), key=self._index.get)
+
+    def related(self, designator: str) -> List[str]:
+        """Neighbours, or the anchor of a part with no signal connections"""
+        neighbours = self.neighbours(designator)
+        if not neighbours and designator in self.anchors:
+            return [self.anchors[designator]]
+        return neighbours
+
+    def clusters(self) -> List[List[str]]:
+        """
+        Connected groups in BFS order, each anchored part placed right after
+        its anchor; parts with no connections or location form a final group.
+        """
+        attached: Dict[str, List[str]] = {}
+        for designator, anchor in self.anchors.items():
+            attached.setdefault(anchor, []).append(designator)
+
+        clusters, seen, loose = [], set(), []
+        for start in self.designators:
+            if start in seen or start in self.anchors:
+                continue
+            if not self._neighbours[start]:
+                loose.append(start)
+                seen.add(start)
+                continue
+            cluster, queue = [], deque([start])
+            seen.add(start)
+            while queue:
+                designator = queue.popleft()
+                cluster.append(designator)
+                cluster.extend(sorted(attached.get(designator, ()), key=self._index.get))
+                for neighbour in self.neighbours(designator):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+            clusters.append(cluster)
+        if loose:
+            clusters.append(loose)
+        return clusters
+
+    def signal_nets(self, designators: List[str]) -> Dict[str, List[str]]:
+        """Signal nets connecting at least two of designators, with those members"""
+        group = set(designators)
+        nets = {}
+        for name, members in self.members.items():
+            inside = [d for d in members if d in group]
+            if len(inside) >= 2:
+                nets[name] = inside
+        return nets
+
+
+def pack_batches(clusters: List[List[str]], cost: Callable[[str], int], budget: int) -> List[List[str]]:
+    """
+    Group clusters into batches of at most budget (per-component cost), largest
+    first; clusters over budget are split into consecutive pieces.
+    """
+    pieces: List[Tuple[int, List[str]]] = []
+    for cluster in clusters:
+        piece, size = [], 0
+        for designator in cluster:
+            item = cost(designator)
+            if piece and size + item > budget:
+                pieces.append((size, piece))
+                piece, size = [], 0
+            piece.append(designator)
+            size += item
+        if piece:
+            pieces.append((size, piece))
+
+    batches: List[Tuple[int, List[str]]] = []
+    for size, piece in sorted(pieces, key=lambda p: -p[0]):  # Stable - ties keep cluster order
+        for i, (used, batch) in enumerate(batches):
+            if used + size <= budget:
+                batches[i] = (used + size, batch + piece)
+                break
+        else:
+            batches.append((size, list(piece)))
+    return [batch for _, batch in batches]
+
+
+def _block_key(name: str) -> str:
+    """Name blocks are matched on across batches ("Power-Supply" == "power supply")"""
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+
+def merge_blocks(batch_blocks: List[Optional[List[Dict]]], graph: ConnectivityGraph) -> List[Dict]:
+    """
+    Reconcile per-batch blocks into one list covering every component.
+
+    - Blocks with the same normalized name are merged (first name/type kept)
+    - A component claimed twice stays in the first block (batch order);
+      unknown designators are dropped
+    - Unassigned components join the block most of their neighbours are in,
+      or a final "Other Components" block
+
+    Deterministic for given batch results: the order of batches decides.
+    """
+    merged: "OrderedDict[str, Dict]" = OrderedDict()
+    owner: Dict[str, str] = {}
+    known = set(graph.designators)
+
+    for blocks in batch_blocks:
+        for block in blocks or []:
+            if not isinstance(block, dict):
+                continue
+            name = str(block.get("name") or "Block").strip()
+            components = []
+            for c in block.get("components") or []:
+                c = str(c)
+                if c in known and c not in owner and c not in components:
+                    components.append(c)
+            if not components:
+                continue
+            key = _block_key(name) or "block"
+            target = merged.get(key)
+            if target is None:
+                target = merged[key] = {
+                    "name": name,
+                    "type": block.get("type") or "other",
+                    "components": [],
+                    "description": block.get("description", ""),
+                    "critical_constraints": [],
+                }
+            target["components"].extend(components)
+            for constraint in block.get("critical_constraints") or []:
+                if constraint not in target["critical_constraints"]:
+                    target["critical_constraints"].append(constraint)
+            for c in components:
+                owner[c] = key
+
+    # Fill gaps (dropped by the LLM or a failed batch) from connectivity
+    assigned = len(owner)
+    order = {key: i for i, key in enumerate(merged)}
+    missing = [d for d in graph.designators if d not in owner]
+    progress = True
+    while missing and progress:
+        progress, remaining = False, []
+        for designator in missing:
+            votes = Counter(owner[n] for n in graph.related(designator) if n in owner)
+            if votes:
+                key = min(votes, key=lambda k: (-votes[k], order[k]))
+                merged[key]["components"].append(designator)
+                owner[designator] = key
+                progress = True
+            else:
+                remaining.append(designator)
+        missing = remaining
+    if missing:
+        merged.setdefault(_block_key(OTHER_BLOCK_NAME), {
+            "name": OTHER_BLOCK_NAME,
+            "type": "other",
+            "components": [],
+            "description": "Components not assigned to a functional block",
+            "critical_constraints": [],
+        })["components"].extend(missing)
+
+    blocks = list(merged.values())
+    logger.info(f"Merged {sum(len(b or []) for b in batch_blocks)} blocks from {len(batch_blocks)} batches "
+                f"into {len(blocks)} ({assigned}/{len(graph.designators)} components assigned by the LLM)")
+    return blocks
@@ -0,0 +1,153 @@
+"""
+Cancellation - Cooperative Cancellation Tokens for Chat Turns
+
+A CancellationToken is created per chat turn by the UI and cancelled when
+the user stops the turn or leaves the page. Work started for the turn stops
+within milliseconds:
+- LLMClient leaves the scheduler queue (no rate budget spent) and closes
+  open streams
+- AltiumMCPClient aborts requests between body chunks
+- Jobs and stage graphs stop at their next checkpoint
+
+The token is passed explicitly (cancel_token=...) or picked up from the
+calling context (use_token / current_token), which job and stage threads
+inherit.
+
+Tokens can also carry a deadline (the turn's time budget, inherited by child
+tokens). Nothing is cancelled when it passes: LLM calls cap their timeouts to
+remaining(), and stages whose full path needs more than what is left take a
+cheaper one and record it with degrade(), so the answer can say what was cut.
+
+OperationCancelled derives from BaseException (like asyncio.CancelledError)
+so the many `except Exception` error handlers don't swallow it.
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OperationCancelled(BaseException):
+    """Raised when work is abandoned through its CancellationToken"""
+
+
+class CancellationToken:
+    """
+    Cancellation flag with callbacks, optionally linked to a parent token.
+
+    Usage:
+        token = CancellationToken()
+        with use_token(token):
+            agent.process_query(...)   # token.cancel() from another thread stops it
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None, timeout_s: Optional[float] = None):
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.reason = ""
+        # Degradations are collected on the root token of the turn
+        self._root = parent._root if parent is not None else self
+        self._degradations: List[str] = []
+        deadlines = [time.monotonic() + timeout_s] if timeout_s is not None else []
+        if parent is not None and parent.deadline is not None:
+            deadlines.append(parent.deadline)
+        self.deadline: Optional[float] = min(deadlines) if deadlines else None  # time.monotonic()
+        if parent is not None:
+            parent.on_cancel(lambda: self.cancel(parent.reason))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel and run the registered callbacks (once)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Cancellation callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled(self.reason)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call callback on cancellation (immediately if already cancelled).
+
+        Returns:
+            Function that unregisters the callback
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def unregister():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return unregister
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout; True if cancelled"""
+        return self._event.wait(timeout)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without one)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def has_budget(self, seconds: float) -> bool:
+        """Whether at least seconds remain (always True without a deadline)"""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def degrade(self, note: str):
+        """Record that a stage took its cheaper path for lack of time"""
+        root = self._root
+        with root._lock:
+            if note not in root._degradations:
+                root._degradations.append(note)
+        logger.info(f"Degraded: {note}")
+
+    @property
+    def degradations(self) -> List[str]:
+        with self._root._lock:
+            return list(self._root._degradations)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Token of the work running in this context (None outside a turn)"""
+    return _current.get()
+
+
+def resolve_token(token: Optional[CancellationToken] = None) -> Optional[CancellationToken]:
+    """An explicitly passed token, else the current context's"""
+    return token if token is not None else _current.get()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]):
+    """Make token the current token for code run in this block"""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
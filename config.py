@@ -9,6 +9,81 @@ load_dotenv()
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Parallel requests in flight
+
+# LLM rate limits (match your OpenAI account tier) - see llm_scheduler.py
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))  # Retries after 429 responses
+LLM_MAX_TRANSIENT_RETRIES = int(os.getenv("LLM_MAX_TRANSIENT_RETRIES", "2"))  # Retries after 5xx, timeouts, dropped connections
+LLM_COMPLETION_TOKEN_ESTIMATE = 500  # Expected completion size when budgeting a request
+LLM_METRICS_LOG = os.getenv("LLM_METRICS_LOG", "logs/llm_calls.jsonl")  # Rotating per-call log ("" to disable)
+
+# Per-stage model routing (see model_router.py). temperature None keeps the caller's value;
+# a stage over max_latency_s (time to the full reply) or first_chunk_s (time to the first
+# streamed chunk, max_latency_s when unset) is retried on its fallback model.
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")
+LLM_ROUTES = {
+    "default": {"model": OPENAI_MODEL, "temperature": None, "max_latency_s": None, "fallback": None},
+    "intent": {"model": LLM_FAST_MODEL, "temperature": 0.3, "max_latency_s": 4.0, "fallback": OPENAI_MODEL},
+    "command": {"model": LLM_FAST_MODEL, "temperature": 0.3, "max_latency_s": 6.0, "fallback": OPENAI_MODEL},
+    "command_response": {"model": LLM_FAST_MODEL, "temperature": 0.8, "max_latency_s": 4.0, "fallback": None},
+    "answer": {"model": OPENAI_MODEL, "temperature": 0.7, "max_latency_s": 30.0, "first_chunk_s": 8.0, "fallback": LLM_FAST_MODEL},
+    "analyze": {"model": OPENAI_MODEL, "temperature": None, "max_latency_s": 45.0, "fallback": LLM_FAST_MODEL},
+    "strategy": {"model": OPENAI_MODEL, "temperature": None, "max_latency_s": 45.0, "fallback": LLM_FAST_MODEL},
+    "review": {"model": OPENAI_MODEL, "temperature": None, "max_latency_s": 45.0, "fallback": LLM_FAST_MODEL},
+    "memory": {"model": LLM_FAST_MODEL, "temperature": 0.2, "max_latency_s": None, "fallback": None},
+}
+LLM_ROUTE_COOLDOWN_S = 300  # How long a stage stays on its fallback after repeated overruns
+
+# LLM backend: "openai" (live), "record" (live + append to corpus), "replay" (offline from corpus)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_CORPUS_PATH = os.getenv("LLM_CORPUS_PATH", "llm_corpus.jsonl")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "false").lower() == "true"  # Reproduce recorded timing
+
+# Conversation memory (see conversation_memory.py)
+CONVERSATION_DIR = os.getenv("CONVERSATION_DIR", "sessions")  # One JSON file per design ("" to disable)
+CONVERSATION_MAX_CHARS = 12000  # Verbatim history cap; older turns are summarized
+CONVERSATION_SUMMARY_MAX_CHARS = 2000
+
+# Background jobs for layout, analysis and review (see job_manager.py)
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "2"))
+JOB_RESULT_RETENTION = 50  # Finished jobs kept for lookup
+
+# Idle-time prefetch after connect / new export (see prefetcher.py)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_LLM_BLOCKS = os.getenv("PREFETCH_LLM_BLOCKS", "false").lower() == "true"  # Speculative LLM block detection
+PREFETCH_POLL_S = 15  # How often an idle session checks for a new export
+
+# Persistent results cache keyed on input content (see results_cache.py)
+RESULTS_CACHE_DIR = os.getenv("RESULTS_CACHE_DIR", "cache/results")  # "" to disable
+RESULTS_CACHE_MAX_MB = int(os.getenv("RESULTS_CACHE_MAX_MB", "200"))
+
+# Functional block detection on large schematics (see block_partitioner.py)
+BLOCK_NET_MAX_FANOUT = int(os.getenv("BLOCK_NET_MAX_FANOUT", "24"))  # Wider nets don't join clusters (like supplies)
+
+# Per-turn time budget (see cancellation.py). A stage whose full path needs more than
+# the time left takes its cheaper path, and the answer lists what was cut short.
+TURN_DEADLINE_S = float(os.getenv("TURN_DEADLINE_S", "60"))  # 0 disables
+TURN_STAGE_MIN_S = {
+    "intent": 4.0,              # LLM intent -> keyword match
+    "functional_blocks": 25.0,  # LLM block detection -> cached blocks only
+    "strategy": 25.0,           # LLM placement strategy -> cached strategy / local analysis
+    "summary": 8.0,             # LLM write-up of analysis/strategy/review -> plain report
+}
+
+# Prompt token budgets per task (see context_packer.py)
+CONTEXT_TOKEN_BUDGETS = {
+    "default": 2000,
+    "intent": 1200,            # Intent classification context + history
+    "functional_blocks": 6000,  # Component list for block detection
+    "summary_sample": 40,      # Sample names inside each context summary
+}
+
+# Local intent classifier (see intent_classifier.py)
+INTENT_LOCAL_CONFIDENCE = float(os.getenv("INTENT_LOCAL_CONFIDENCE", "0.6"))  # Below this the LLM decides
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "logs/intent_queries.jsonl")  # LLM-decided intents for training
+FUSED_INTENT_STREAMING = os.getenv("FUSED_INTENT_STREAMING", "true").lower() == "true"  # One call for intent + answer
 
 # MCP Configuration
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8080")
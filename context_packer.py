@@ -0,0 +1,229 @@
+"""
+Context Packer - Token-Budgeted Prompt Assembly
+
+This module keeps LLM prompts as small as the task allows:
+- Estimates token counts (tiktoken if installed, calibrated heuristic otherwise)
+- Fills a per-task token budget by priority (query, components, nets, rules, ...)
+- Trims list-like sections item by item instead of slicing at fixed counts
+
+Sections are rendered in the order they were added, but budget is
+allocated in priority order, so a long history never crowds out the query.
+"""
+import math
+from typing import Dict, List, Any
+from dataclasses import dataclass
+from enum import IntEnum
+from config import OPENAI_MODEL, CONTEXT_TOKEN_BUDGETS
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency - fall back to heuristic
+    tiktoken = None
+
+
+# Average characters per token for our prompts (designators, JSON, English).
+# Measured against cl100k_base on exported schematic/PCB context; slightly
+# conservative so the heuristic over- rather than under-estimates.
+CHARS_PER_TOKEN = 3.5
+
+_encoding = None
+
+
+def _get_encoding():
+    """Load the tokenizer for the configured model once"""
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+        except Exception:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def get_token_budget(task: str) -> int:
+    """Get the token budget for an orchestrator/analyzer task"""
+    return CONTEXT_TOKEN_BUDGETS.get(task, CONTEXT_TOKEN_BUDGETS["default"])
+
+
+class ContextPriority(IntEnum):
+    """Budget allocation order (lower is filled first)"""
+    QUERY = 0
+    COMPONENTS = 1
+    NETS = 2
+    RULES = 3
+    SUMMARY = 4
+    HISTORY = 5
+
+
+@dataclass
+class ContextSection:
+    """A named block of prompt context"""
+    name: str
+    priority: int
+    text: str = ""
+    items: List[str] = None
+    header: str = ""
+    separator: str = "\n"
+    keep: str = "head"  # "head" keeps the first items, "tail" the most recent
+    packed: str = ""
+    dropped: int = 0
+
+
+class ContextPacker:
+    """
+    Packs prompt sections into a token budget.
+
+    Usage:
+        packer = ContextPacker(get_token_budget("intent"))
+        packer.add("design", summary, ContextPriority.SUMMARY)
+        packer.add_items("history", lines, ContextPriority.HISTORY, keep="tail")
+        packer.add("query", f"User query: {query}", ContextPriority.QUERY)
+        prompt = packer.pack()
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.sections: List[ContextSection] = []
+        self.used_tokens = 0
+
+    def add(self, name: str, text: str, priority: int = ContextPriority.SUMMARY):
+        """Add a free-text section (truncated at line boundaries if over budget)"""
+        if text:
+            self.sections.append(ContextSection(name=name, priority=priority, text=text))
+        return self
+
+    def add_items(self, name: str, items: List[str], priority: int = ContextPriority.COMPONENTS,
+                  header: str = "", separator: str = "\n", keep: str = "head"):
+        """Add a list section that is filled item by item"""
+        if items:
+            self.sections.append(ContextSection(
+                name=name,
+                priority=priority,
+                items=list(items),
+                header=header,
+                separator=separator,
+                keep=keep
+            ))
+        return self
+
+    def pack(self, joiner: str = "\n\n") -> str:
+        """Allocate budget by priority and render sections in insertion order"""
+        remaining = self.budget
+
+        for section in sorted(self.sections, key=lambda s: s.priority):
+            if section.items is not None:
+                section.packed, cost = self._fit_items(section, remaining)
+            else:
+                section.packed, cost = self._fit_text(section.text, remaining,
+                                                      truncate=section.priority == ContextPriority.QUERY)
+            remaining -= cost
+
+        self.used_tokens = self.budget - remaining
+        return joiner.join(s.packed for s in self.sections if s.packed)
+
+    def get_report(self) -> Dict[str, Any]:
+        """Get what was kept/dropped in the last pack() call"""
+        return {
+            "budget": self.budget,
+            "used_tokens": self.used_tokens,
+            "dropped_items": {s.name: s.dropped for s in self.sections if s.dropped}
+        }
+
+    def _fit_text(self, text: str, remaining: int, truncate: bool = False) -> tuple:
+        """
+        Fit free text, cutting whole lines from the end.
+        With truncate=True the first line that doesn't fit is cut by characters
+        instead of dropped, so a long single-line query is never lost.
+        """
+        cost = estimate_tokens(text)
+        if cost <= remaining:
+            return text, cost
+
+        kept = []
+        used = 0
+        for line in text.split("\n"):
+            line_cost = estimate_tokens(line) + 1
+            if used + line_cost > remaining:
+                if truncate:
+                    line = _truncate_chars(line, remaining - used - 1)
+                    if line:
+                        kept.append(line)
+                        used += estimate_tokens(line) + 1
+                break
+            kept.append(line)
+            used += line_cost
+        return "\n".join(kept), used
+
+    def _fit_items(self, section: ContextSection, remaining: int) -> tuple:
+        """Fit as many list items as the budget allows"""
+        used = estimate_tokens(section.header) + 1 if section.header else 0
+        if used >= remaining:
+            section.dropped = len(section.items)
+            return "", 0
+
+        ordered = section.items if section.keep == "head" else list(reversed(section.items))
+        kept = []
+        for item in ordered:
+            item_cost = estimate_tokens(item) + 1
+            if used + item_cost > remaining:
+                break
+            kept.append(item)
+            used += item_cost
+
+        # The "... (+N more)" marker is part of the section, so make room for it
+        while kept and len(kept) < len(section.items):
+            marker_cost = estimate_tokens(_more_marker(len(section.items) - len(kept))) + 1
+            if used + marker_cost <= remaining:
+                used += marker_cost
+                break
+            used -= estimate_tokens(kept.pop()) + 1
+
+        if not kept:
+            section.dropped = len(section.items)
+            return "", 0
+
+        if section.keep == "tail":
+            kept.reverse()
+        section.dropped = len(section.items) - len(kept)
+
+        body = section.separator.join(kept)
+        if section.dropped:
+            body += section.separator + _more_marker(section.dropped)
+        text = f"{section.header}\n{body}" if section.header else body
+        return text, used
+
+
+def _more_marker(dropped: int) -> str:
+    """Note for list items left out of a section"""
+    return f"... (+{dropped} more)"
+
+
+def _truncate_chars(text: str, max_tokens: int) -> str:
+    """Longest prefix of text (ending in "...") that fits in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid] + "...") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "..." if lo else ""
+
+
+def fit_items(items: List[str], max_tokens: int, separator: str = ", ") -> str:
+    """Join as many items as fit in max_tokens, noting how many were left out"""
+    packer = ContextPacker(max_tokens)
+    packer.add_items("items", items, separator=separator)
+    return packer.pack()
@@ -0,0 +1,159 @@
+"""
+Context Snapshot - Versioned Design Context Shared Across a Chat Turn
+
+All design documents exported by Altium (PCB, schematic, project, rules, ...)
+are fetched once per turn into an immutable ContextSnapshot that every stage
+of the turn reads from. Each document carries a version (export file mtime
+and size, from the MCP server's /altium/files/versions endpoint):
+- Unchanged versions on the next turn reuse the previous snapshot as-is
+- Changed documents are re-fetched individually; the rest are carried over
+- Derived values (context summaries, ...) are memoized per document version
+  and carried over to the next snapshot with the unchanged documents
+
+Snapshot documents are the parsed JSON from the server and must be treated
+as read-only - they are shared between turns.
+"""
+import time
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Mapping, Iterator, Callable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Snapshot document name -> AltiumMCPClient getter
+DOCUMENT_GETTERS = {
+    "pcb_info": "get_pcb_info",
+    "schematic_info": "get_schematic_info",
+    "project_info": "get_project_info",
+    "verification_report": "get_verification_report",
+    "design_rules": "get_design_rules",
+    "board_config": "get_board_config",
+    "component_search": "get_component_search",
+    "output_result": "get_output_result",
+    "library_list": "get_library_list",
+}
+
+
+class ContextSnapshot(Mapping):
+    """
+    Immutable view of all design documents at one point in time.
+
+    Reads like the plain context dict it replaces (snapshot.get("pcb_info"),
+    snapshot["schematic_info"]) and adds per-document versions.
+    """
+
+    def __init__(self, documents: Dict[str, Any], versions: Dict[str, Optional[str]],
+                 memo: Dict[Tuple[Optional[str], str], Any] = None):
+        self._documents = MappingProxyType(dict(documents))
+        self.versions = MappingProxyType(dict(versions))
+        self.created_at = time.time()
+        self._memo: Dict[Tuple[Optional[str], str], Any] = dict(memo or {})
+        self._memo_lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Any:
+        return self._documents[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __bool__(self) -> bool:
+        return any(value for value in self._documents.values())
+
+    def version(self, name: str) -> Optional[str]:
+        """Version of one document (None if unknown or missing)"""
+        return self.versions.get(name)
+
+    def memoize(self, name: Optional[str], kind: str, compute: Callable[[Any], Any]) -> Any:
+        """
+        Compute a value derived from one document once per document version.
+
+        Args:
+            name: Document name, or None for a value derived from the whole snapshot
+                (kept for this snapshot only)
+            kind: What is derived (e.g. "summary")
+            compute: Called with the document (or the snapshot when name is None)
+        """
+        key = (name, kind)
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute(self if name is None else self._documents.get(name))
+        with self._memo_lock:
+            self._memo[key] = value
+        return value
+
+    def carried_memo(self, versions: Dict[str, Optional[str]]) -> Dict[Tuple[Optional[str], str], Any]:
+        """Memoized values still valid for a snapshot with the given versions"""
+        with self._memo_lock:
+            return {
+                (name, kind): value for (name, kind), value in self._memo.items()
+                if name is not None and self.version(name) and versions.get(name) == self.version(name)
+            }
+
+    def __repr__(self) -> str:
+        present = [name for name, value in self._documents.items() if value]
+        return f"ContextSnapshot({', '.join(present) or 'empty'})"
+
+
+EMPTY_SNAPSHOT = ContextSnapshot({}, {})
+
+
+class ContextProvider:
+    """
+    Produces a ContextSnapshot per turn, re-fetching only what changed.
+
+    Usage:
+        provider = ContextProvider(mcp_client)
+        snapshot = provider.current()   # once per turn
+    """
+
+    def __init__(self, mcp_client):
+        self.mcp_client = mcp_client
+        self._snapshot: Optional[ContextSnapshot] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> ContextSnapshot:
+        """Snapshot of the design as it is now"""
+        if not self.mcp_client.connected:
+            return EMPTY_SNAPSHOT
+
+        with self._lock:
+            reported = self.mcp_client.get_document_versions() or {}
+            versions = {name: reported[name] for name in DOCUMENT_GETTERS if name in reported}
+            previous = self._snapshot
+            documents = {}
+            fetched = []
+            for name, getter in DOCUMENT_GETTERS.items():
+                version = versions.get(name)
+                if previous is not None and version and previous.version(name) == version:
+                    documents[name] = previous.get(name)
+                elif name in versions and version is None:
+                    # Not exported - nothing to fetch
+                    documents[name] = None
+                else:
+                    documents[name] = getattr(self.mcp_client, getter)()
+                    fetched.append(name)
+                    if documents[name] is None:
+                        # Fetch failed (timeout, parse error) - don't pin None to this
+                        # version, so the next turn retries
+                        versions.pop(name, None)
+
+            versions = {name: versions.get(name) for name in DOCUMENT_GETTERS}
+            if previous is not None and not fetched and dict(previous.versions) == versions:
+                return previous
+
+            memo = previous.carried_memo(versions) if previous is not None else None
+            self._snapshot = ContextSnapshot(documents, versions, memo)
+            if fetched:
+                logger.info(f"Context refreshed: {', '.join(fetched)}")
+            return self._snapshot
+
+    def invalidate(self):
+        """Forget the cached snapshot (next turn fetches everything)"""
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,245 @@
+"""
+Conversation Memory - Bounded, Summarizing, Persistent Chat History
+
+Replaces the unbounded conversation_history list:
+- Hard cap on the characters kept verbatim; older turns are moved out
+- Moved-out turns are folded into a rolling summary by a background LLM call
+  (BACKGROUND priority, never blocks the chat turn)
+- One session per design, persisted to disk after every change, so restarting
+  the app or switching boards picks the conversation back up
+
+Behaves like the list it replaces for append(), len(), iteration and slicing.
+"""
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from config import CONVERSATION_DIR, CONVERSATION_MAX_CHARS, CONVERSATION_SUMMARY_MAX_CHARS
+from llm_scheduler import RequestPriority
+from prompts import MEMORY_SUMMARY_SYSTEM_PROMPT
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationMemory:
+    """
+    Chat history with a memory cap, background summarization and persistence.
+
+    Usage:
+        memory = ConversationMemory(llm_client)
+        memory.switch_session("MyBoard")
+        memory.append({"role": "user", "content": "..."})
+        messages.extend(memory.recent(4))  # summary + last 4 messages
+    """
+
+    # Longest single message kept while waiting to be summarized
+    PENDING_CLIP_CHARS = 1000
+
+    def __init__(self, llm_client=None, session_dir: str = CONVERSATION_DIR,
+                 max_chars: int = CONVERSATION_MAX_CHARS,
+                 summary_max_chars: int = CONVERSATION_SUMMARY_MAX_CHARS):
+        self.llm_client = llm_client
+        self.session_dir = Path(session_dir) if session_dir else None
+        self.max_chars = max_chars
+        self.summary_max_chars = summary_max_chars
+        self.session_id = "default"
+        self.messages: List[Dict[str, str]] = []
+        self.summary = ""
+        self._pending: List[Dict[str, str]] = []  # Moved out, not yet summarized
+        self._lock = threading.RLock()
+        self._summarizing = False
+        self._load()
+
+    # --- list compatibility ---------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(list(self.messages))
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self.messages[index]
+
+    def append(self, message: Dict[str, str]):
+        """Add a message, enforcing the memory cap"""
+        with self._lock:
+            self.messages.append({"role": message["role"], "content": message.get("content") or ""})
+            self._enforce_cap()
+            self._save()
+
+    # --- context for prompts ----------------------------------------------------
+
+    def recent(self, count: int) -> List[Dict[str, str]]:
+        """The rolling summary (if any) followed by the last `count` messages"""
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"Earlier in this conversation: {self.summary}"})
+            messages.extend(self.messages[-count:] if count else [])
+            return messages
+
+    # --- sessions ---------------------------------------------------------------
+
+    @staticmethod
+    def session_for(all_context: Dict[str, Any]) -> str:
+        """Session id for a design (project, PCB or schematic name)"""
+        project = (all_context.get("project_info") or {}).get("project", {})
+        schematic = (all_context.get("schematic_info") or {}).get("schematic", {})
+        name = (project.get("name") if isinstance(project, dict) else None) \
+            or (all_context.get("pcb_info") or {}).get("file_name") \
+            or (schematic.get("name") if isinstance(schematic, dict) else None)
+        if not name:
+            return "default"
+        return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(name)).strip("._") or "default"
+
+    def switch_session(self, session_id: str):
+        """Persist the current session and load another one"""
+        with self._lock:
+            if session_id == self.session_id:
+                return
+            self._save()
+            self.session_id = session_id
+            self.messages, self.summary, self._pending = [], "", []
+            self._load()
+            logger.info(f"Conversation session: {session_id} ({len(self.messages)} messages)")
+
+    def clear(self):
+        """Forget the current session (memory and disk)"""
+        with self._lock:
+            self.messages, self.summary, self._pending = [], "", []
+            path = self._path()
+            if path and path.exists():
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.error(f"Could not delete session {path}: {e}")
+
+    # --- cap and summarization ---------------------------------------------------
+
+    def _size(self) -> int:
+        return sum(len(m["content"]) for m in self.messages)
+
+    def _enforce_cap(self):
+        """Move the oldest messages out until under the cap; summarize them in the background"""
+        moved = False
+        # Always keep the latest exchange verbatim
+        while len(self.messages) > 2 and self._size() > self.max_chars:
+            message = self.messages.pop(0)
+            self._pending.append({"role": message["role"], "content": message["content"][:self.PENDING_CLIP_CHARS]})
+            moved = True
+        if moved:
+            self._start_summarizer()
+
+    def _start_summarizer(self):
+        if self._pending and not self._summarizing:
+            self._summarizing = True
+            threading.Thread(target=self._summarize_pending, name="ConversationSummary", daemon=True).start()
+
+    def _summarize_pending(self):
+        """Fold pending messages into the rolling summary (background thread)"""
+        try:
+            while True:
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    summary, session_id = self.summary, self.session_id
+                    if not pending:
+                        self._summarizing = False
+                        return
+
+                try:
+                    updated = self._fold(summary, pending)
+                except Exception as e:
+                    # Never drop the batch: it is already out of messages and _pending
+                    logger.error(f"Conversation summarization failed, keeping the gist: {e}")
+                    updated = self._gist(summary, pending)
+
+                with self._lock:
+                    if self.session_id == session_id:
+                        self.summary = updated[:self.summary_max_chars]
+                        self._save()
+                    else:
+                        # Switched away meanwhile - the saved session no longer holds the batch
+                        self._save_summary(session_id, updated[:self.summary_max_chars])
+        except Exception as e:
+            logger.error(f"Conversation summarization failed: {e}")
+            with self._lock:
+                self._summarizing = False
+
+    def _fold(self, summary: str, pending: List[Dict[str, str]]) -> str:
+        """New summary covering `summary` and `pending`"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in pending)
+        if self.llm_client is not None:
+            messages = [
+                {"role": "system", "content": MEMORY_SUMMARY_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"}
+            ]
+            response = self.llm_client.chat(messages, priority=RequestPriority.BACKGROUND, stage="memory")
+            if response:
+                return response.strip()
+        # No LLM (or it failed): keep the gist of each message
+        return self._gist(summary, pending)
+
+    def _gist(self, summary: str, pending: List[Dict[str, str]]) -> str:
+        """Extractive summary: `summary` plus the start of each pending message"""
+        gist = " | ".join(f"{m['role']}: {m['content'][:120]}" for m in pending)
+        return f"{summary} | {gist}".strip(" |")[-self.summary_max_chars:]
+
+    # --- persistence ------------------------------------------------------------
+
+    def _path(self, session_id: Optional[str] = None) -> Optional[Path]:
+        session_id = session_id or self.session_id
+        return self.session_dir / f"{session_id}.json" if self.session_dir else None
+
+    def _save_summary(self, session_id: str, summary: str):
+        """Store a summary in another (saved) session's file"""
+        path = self._path(session_id)
+        if not path:
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else \
+                {"session_id": session_id, "pending": [], "messages": []}
+            data["summary"] = summary
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix(".tmp")
+            temp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(temp, path)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not save summary of session {session_id}: {e}")
+
+    def _save(self):
+        path = self._path()
+        if not path or not (self.messages or self.summary or self._pending or path.exists()):
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_suffix(".tmp")
+            temp.write_text(json.dumps({
+                "session_id": self.session_id,
+                "summary": self.summary,
+                # Unsummarized messages are kept so nothing is lost on restart
+                "pending": self._pending,
+                "messages": self.messages
+            }, ensure_ascii=False), encoding="utf-8")
+            os.replace(temp, path)
+        except OSError as e:
+            logger.error(f"Could not save conversation session: {e}")
+
+    def _load(self):
+        path = self._path()
+        if not path or not path.exists():
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Could not load conversation session {path}: {e}")
+            return
+        self.summary = data.get("summary", "")
+        self.messages = data.get("messages", [])
+        self._pending = data.get("pending", [])
+        self._enforce_cap()
+        self._start_summarizer()
@@ -8,8 +8,86 @@ This module provides intelligent analysis of schematic and PCB data:
 - Design intent inference
 """
 import json
-from typing import Dict, List, Any, Optional
+import threading
+from collections.abc import Mapping
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator
 from llm_client import LLMClient
+from llm_scheduler import RequestPriority
+from context_packer import ContextPacker, ContextPriority, get_token_budget, estimate_tokens
+from results_cache import canonical_hash, get_results_cache
+from block_partitioner import (
+    ConnectivityGraph, pack_batches, merge_blocks, designator_of,
+    POWER_NET_PATTERNS, GROUND_NET_PATTERNS
+)
+from stage_graph import StageGraph
+from config import LLM_MAX_CONCURRENCY
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Share of a block detection call's token budget for component lines (signal nets get the rest)
+BLOCK_COMPONENT_SHARE = 0.75
+
+# Item arrays of a placement strategy, in streaming order
+STRATEGY_SECTIONS = ("board_zones", "placement_order", "critical_spacing", "routing_priorities")
+
+# Analysis sections each analysis_type needs (anything else: all sections)
+ANALYSIS_SECTIONS = {
+    "functional_blocks": ("component_summary", "functional_blocks", "design_type", "critical_components"),
+    "signal_paths": ("signal_analysis", "design_type"),
+    "constraints": ("signal_analysis", "design_type", "critical_components"),
+}
+
+
+class SchematicAnalysis(Mapping):
+    """
+    Lazily evaluated schematic analysis.
+
+    Reads like the analysis dict it replaces, but each section is computed on
+    first access and stored in the analyzer's per-schematic cache, so asking
+    for signal_analysis never runs the LLM functional block detection.
+    """
+    
+    def __init__(self, sections: Dict[str, Callable[[], Any]], cache: Dict[str, Any],
+                 locks: Optional[Dict[str, threading.Lock]] = None):
+        self._sections = sections
+        self._cache = cache
+        # Shared by every analysis of the same schematic, so a section being
+        # computed elsewhere (e.g. by the prefetcher) is waited for, not repeated
+        self._locks = locks if locks is not None else {}
+        for name in sections:
+            self._locks.setdefault(name, threading.Lock())
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._sections:
+            raise KeyError(name)
+        if name in self._cache:
+            return self._cache[name]
+        with self._locks[name]:  # One computation per section, even across threads
+            if name not in self._cache:
+                value = self._sections[name]()
+                if value is None:
+                    return None  # Failed (e.g. LLM error) - retry on next access
+                self._cache[name] = value
+            return self._cache[name]
+    
+    def __contains__(self, name) -> bool:
+        return name in self._sections  # Without computing the section
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+    
+    def __len__(self) -> int:
+        return len(self._sections)
+    
+    def computed(self) -> List[str]:
+        """Sections already computed"""
+        return [name for name in self._sections if name in self._cache]
+    
+    def to_dict(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Plain dict of the given sections (all by default), computing them as needed"""
+        return {name: self[name] for name in (sections or self._sections) if name in self._sections}
 
 
 class DesignAnalyzer:
@@ -19,42 +97,107 @@ class DesignAnalyzer:
     """
     
     def __init__(self, llm_client: LLMClient = None):
-        self.llm_client = llm_client or LLMClient()
+        self._llm_client = llm_client  # Created on first LLM call (headless runs may never need one)
         self.schematic_data = None
         self.pcb_data = None
+        self.schematic_version = None
         self.analysis_cache = {}
+        self._analysis_locks = {}
+        self._input_key = None  # Content hash of the loaded schematic
+        self.results_cache = get_results_cache()  # Persists sections across sessions
+        # Scheduling class for LLM calls; prefetch/batch callers lower this
+        self.priority = RequestPriority.INTERACTIVE
+    
+    @property
+    def llm_client(self) -> LLMClient:
+        if self._llm_client is None:
+            self._llm_client = LLMClient()
+        return self._llm_client
     
-    def load_schematic_data(self, data: Dict[str, Any]):
-        """Load schematic data for analysis"""
+    def load_schematic_data(self, data: Dict[str, Any], version: Optional[str] = None):
+        """
+        Load schematic data for analysis.
+        
+        Args:
+            data: Exported schematic_info
+            version: Document version (see ContextSnapshot); analysis sections
+                stay cached while the version is unchanged
+        """
+        if data is self.schematic_data or (version and version == self.schematic_version):
+            self.schematic_data = data
+            return  # Same schematic - keep the cache
         self.schematic_data = data
+        self.schematic_version = version
         self.analysis_cache = {}  # Clear cache on new data
+        self._analysis_locks = {}
+        self._input_key = None
     
     def load_pcb_data(self, data: Dict[str, Any]):
         """Load PCB data for analysis"""
         self.pcb_data = data
     
-    def analyze_schematic(self) -> Dict[str, Any]:
+    def analyze_schematic(self, on_block: Optional[Callable[[Dict], None]] = None,
+                          priority: Optional[RequestPriority] = None) -> Mapping:
         """
         Perform comprehensive schematic analysis.
-        Returns functional blocks, signal paths, and design insights.
+        Returns functional blocks, signal paths, and design insights as a
+        SchematicAnalysis: each section is computed on first access and cached
+        until a different schematic is loaded.
+        
+        Args:
+            on_block: Optional callback receiving each functional block as soon
+                as the LLM has finished describing it
+            priority: Scheduling class for the block detection call
+                (defaults to self.priority)
         """
         if not self.schematic_data:
             return {"error": "No schematic data loaded"}
         
+        priority = self.priority if priority is None else priority
+        
         # Build analysis context
         components = self.schematic_data.get("components", [])
         nets = self.schematic_data.get("nets", []) or self.schematic_data.get("wires", [])
         
-        analysis = {
-            "component_summary": self._summarize_components(components),
-            "functional_blocks": self._detect_functional_blocks(components, nets),
-            "signal_analysis": self._analyze_signals(nets),
-            "design_type": self._infer_design_type(components),
-            "critical_components": self._identify_critical_components(components),
-            "recommendations": []
+        sections = {
+            "component_summary": lambda: self._summarize_components(components),
+            "functional_blocks": lambda: self._detect_functional_blocks(components, nets, on_block, priority),
+            "signal_analysis": lambda: self._analyze_signals(nets),
+            "design_type": lambda: self._infer_design_type(components),
+            "critical_components": lambda: self._identify_critical_components(components),
+            "recommendations": lambda: []
         }
-        
-        return analysis
+        return SchematicAnalysis({
+            name: (lambda name=name, compute=compute: self.results_cache.get_or_compute(
+                f"analysis_{name}", self._schematic_key(), compute))
+            for name, compute in sections.items()
+        }, self.analysis_cache, self._analysis_locks)
+    
+    def _schematic_key(self) -> str:
+        """Content hash of the loaded schematic's components and nets"""
+        if self._input_key is None:
+            data = self.schematic_data or {}
+            self._input_key = canonical_hash(data.get("components", []),
+                                             data.get("nets", []) or data.get("wires", []))
+        return self._input_key
+    
+    def known_functional_blocks(self) -> Optional[List[Dict]]:
+        """
+        Functional blocks already detected for the loaded schematic, in this
+        session or a previous one (never calls the LLM)
+        """
+        blocks = self.analysis_cache.get("functional_blocks")
+        if blocks is None and self.schematic_data:
+            blocks = self.results_cache.get("analysis_functional_blocks", self._schematic_key())
+            if blocks is not None:
+                self.analysis_cache["functional_blocks"] = blocks
+        return blocks
+    
+    def cached_placement_strategy(self) -> Optional[Dict[str, Any]]:
+        """Placement strategy stored for the loaded schematic, if any (never calls the LLM)"""
+        if not self.schematic_data:
+            return None
+        return self.results_cache.get("placement_strategy", self._schematic_key())
     
     def _summarize_components(self, components: List[Dict]) -> Dict[str, Any]:
         """Summarize component types and counts"""
@@ -91,28 +234,86 @@ class DesignAnalyzer:
         
         return summary
     
-    def _detect_functional_blocks(self, components: List[Dict], nets: List[Dict]) -> List[Dict]:
+    def _detect_functional_blocks(self, components: List[Dict], nets: List[Dict],
+                                  on_block: Optional[Callable[[Dict], None]] = None,
+                                  priority: Optional[RequestPriority] = None) -> Optional[List[Dict]]:
         """
         Use LLM to detect functional blocks in the schematic.
         Groups components by function (power, MCU, interfaces, etc.)
+        
+        The schematic is split into signal-connectivity clusters packed into
+        token-budgeted batches (see block_partitioner.py); batches are analyzed
+        concurrently and merged so every component ends up in exactly one
+        block. Small designs fit one batch, i.e. one call as before.
+        Blocks are streamed to on_block as each one closes in a response
+        (before merging). Returns None if any call failed.
         """
         if not components:
             return []
         
-        # Prepare component list for LLM
-        comp_list = []
-        for comp in components[:50]:  # Limit for token efficiency
-            comp_list.append({
-                "designator": comp.get("designator", ""),
+        graph = ConnectivityGraph(components, nets)
+        comp_lines = {}
+        for comp in components:
+            designator = designator_of(comp)
+            comp_lines.setdefault(designator, json.dumps({
+                "designator": designator,
                 "value": comp.get("value", ""),
                 "footprint": comp.get("footprint", ""),
                 "description": comp.get("description", "")
-            })
+            }))
+        budget = get_token_budget("functional_blocks")
+        batches = pack_batches(graph.clusters(), lambda d: estimate_tokens(comp_lines[d]) + 1,
+                               int(budget * BLOCK_COMPONENT_SHARE))
+        
+        lock = threading.Lock()
+        
+        def emit(key: str, block: Dict):
+            with lock:  # Batches stream concurrently
+                on_block(block)
+        
+        stages = StageGraph(max_workers=LLM_MAX_CONCURRENCY)
+        for i, batch in enumerate(batches):
+            nets_in_batch = graph.signal_nets(batch)
+            packer = ContextPacker(budget)
+            packer.add_items("components", [comp_lines[d] for d in batch], ContextPriority.COMPONENTS,
+                             header="Components:")
+            packer.add_items("nets", [f"{name}: {', '.join(members)}" for name, members in nets_in_batch.items()],
+                             ContextPriority.NETS, header="Signal nets (power and ground omitted):")
+            messages = self._block_detection_messages(packer.pack(), part=(i + 1, len(batches)))
+            stages.add(f"blocks_{i + 1}", lambda messages=messages: self.llm_client.chat_json_stream(
+                messages,
+                array_keys=["blocks"],
+                on_item=emit if on_block else None,
+                temperature=0.3,
+                priority=self.priority if priority is None else priority,
+                stage="analyze"
+            ))
+        results = stages.run()
         
+        batch_blocks = []
+        for i in range(len(batches)):
+            result = results.get(f"blocks_{i + 1}")
+            batch_blocks.append(result.get("blocks", []) if isinstance(result, dict) else None)
+        failed = sum(1 for blocks in batch_blocks if blocks is None)
+        if failed:
+            # Failed clusters share no nets with the rest, so they would all land in
+            # "Other Components" - don't cache a partial answer, retry on next access
+            logger.error(f"Functional blocks: {failed}/{len(batches)} batches failed")
+            return None
+        if len(batches) > 1:
+            logger.info(f"Functional blocks: {len(graph.designators)} components in {len(batches)} batches")
+        return merge_blocks(batch_blocks, graph)
+    
+    @staticmethod
+    def _block_detection_messages(context: str, part: tuple = (1, 1)) -> List[Dict[str, str]]:
+        """Prompt for one batch of block detection"""
+        index, total = part
+        scope = "" if total == 1 else (
+            f"\nThis is part {index} of {total} of a larger schematic, grouped by connectivity; "
+            "name blocks by function so they can be matched across parts.\n")
         prompt = f"""Analyze these electronic components and identify functional blocks.
-
-Components:
-{json.dumps(comp_list, indent=2)}
+{scope}
+{context}
 
 Identify and group components into functional blocks such as:
 - Power Supply (regulators, inductors, bulk capacitors)
@@ -125,6 +326,8 @@ Identify and group components into functional blocks such as:
 - Sensors
 - LED/Display
 
+Assign every listed component to exactly one block.
+
 Return JSON format:
 {{
     "blocks": [
@@ -137,25 +340,10 @@ Return JSON format:
         }}
     ]
 }}"""
-
-        messages = [
+        return [
             {"role": "system", "content": "You are an expert PCB design engineer. Analyze component lists and identify functional blocks."},
             {"role": "user", "content": prompt}
         ]
-        
-        response = self.llm_client.chat(messages, temperature=0.3)
-        
-        try:
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                result = json.loads(json_match.group())
-                return result.get("blocks", [])
-        except:
-            pass
-        
-        return []
     
     def _analyze_signals(self, nets: List[Dict]) -> Dict[str, Any]:
         """Analyze signal types and characteristics"""
@@ -173,9 +361,9 @@ Return JSON format:
             net_name_upper = net_name.upper()
             
             # Classify by name patterns
-            if any(p in net_name_upper for p in ["VCC", "VDD", "3V3", "5V", "12V", "VBAT", "+V"]):
+            if any(p in net_name_upper for p in POWER_NET_PATTERNS):
                 signal_analysis["power_nets"].append(net_name)
-            elif any(p in net_name_upper for p in ["GND", "VSS", "GROUND", "AGND", "DGND"]):
+            elif any(p in net_name_upper for p in GROUND_NET_PATTERNS):
                 signal_analysis["ground_nets"].append(net_name)
             elif any(p in net_name_upper for p in ["CLK", "CLOCK", "USB", "ETH", "HDMI", "PCIE"]):
                 signal_analysis["high_speed_nets"].append(net_name)
@@ -251,14 +439,26 @@ Return JSON format:
         
         return critical
     
-    def generate_placement_strategy(self) -> Dict[str, Any]:
+    def generate_placement_strategy(self, on_item: Optional[Callable[[str, Dict], None]] = None) -> Dict[str, Any]:
         """
         Generate a placement strategy based on schematic analysis.
         Returns recommended placement zones and component positions.
+        
+        Args:
+            on_item: Optional callback (section, item) receiving each zone,
+                placement step, spacing rule or routing priority as it streams in
         """
         if not self.schematic_data:
             return {"error": "No schematic data loaded"}
         
+        # Unchanged schematic: reuse the stored strategy (replayed to on_item)
+        cached = self.cached_placement_strategy()
+        if cached is not None:
+            for section in STRATEGY_SECTIONS:
+                for item in (cached.get(section) or []) if on_item else []:
+                    on_item(section, item)
+            return cached
+        
         # First analyze the schematic
         analysis = self.analyze_schematic()
         blocks = analysis.get("functional_blocks", [])
@@ -303,16 +503,18 @@ Return JSON format:
             {"role": "user", "content": prompt}
         ]
         
-        response = self.llm_client.chat(messages, temperature=0.3)
-        
-        try:
-            import re
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if json_match:
-                return json.loads(json_match.group())
-        except:
-            pass
+        result = self.llm_client.chat_json_stream(
+            messages,
+            array_keys=list(STRATEGY_SECTIONS),
+            on_item=on_item,
+            temperature=0.3,
+            priority=self.priority,
+            stage="strategy"
+        )
         
+        if isinstance(result, dict):
+            self.results_cache.put("placement_strategy", self._schematic_key(), result)
+            return result
         return {"error": "Failed to generate placement strategy"}
     
     def review_design(self) -> Dict[str, Any]:
@@ -364,7 +566,7 @@ def analyze_design(schematic_data: Dict, pcb_data: Dict = None) -> Dict[str, Any
         analyzer.load_pcb_data(pcb_data)
     
     return {
-        "analysis": analyzer.analyze_schematic(),
+        "analysis": dict(analyzer.analyze_schematic()),
         "placement_strategy": analyzer.generate_placement_strategy(),
         "design_review": analyzer.review_design()
     }
@@ -0,0 +1,270 @@
+"""
+Design Index - Search Index over Design Entities
+
+Indexes the components and nets of one exported document (pcb_info or
+schematic_info) by designator, value, footprint, parameter values, net name
+and library reference, with:
+- Exact lookup (hash map)
+- Prefix lookup (bisect over sorted keys)
+- Fuzzy lookup (trigram postings, Jaccard similarity); designator-shaped
+  terms (R12, U3A - letters the board's designators use, then digits) only
+  match exactly, since R9999 is no answer to R99999, while part numbers
+  like STM32 also match by prefix (STM32F103)
+
+Keys are case-insensitive and treat "_" and spaces alike, so "USB DP"
+finds net USB_DP.
+
+Lookups cost O(matches) rather than a scan of the component list, so
+retrieval stays cheap on 10k-component boards. Build once per document
+version (see ContextSnapshot.memoize).
+"""
+import re
+import bisect
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Any, Set, Iterable, Optional
+
+
+@dataclass
+class DesignEntity:
+    """An indexed component or net"""
+    kind: str  # "component" or "net"
+    name: str
+    data: Any  # Original exported dict (or string)
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+# Query words that never name a design entity
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "of", "on", "in", "to", "for", "and", "or", "what", "where",
+    "which", "how", "many", "much", "show", "list", "all", "me", "my", "its", "it", "this", "that",
+    "component", "components", "net", "nets", "value", "location", "size", "located", "board",
+    "pcb", "schematic", "layer", "layers", "find", "tell", "about", "there", "does", "do", "with",
+}
+
+# Category words -> designator prefixes
+CATEGORY_PREFIXES = {
+    "resistor": ("R",), "resistors": ("R",),
+    "capacitor": ("C",), "capacitors": ("C",),
+    "inductor": ("L",), "inductors": ("L",),
+    "diode": ("D",), "diodes": ("D",), "led": ("D", "LED"), "leds": ("D", "LED"),
+    "transistor": ("Q",), "transistors": ("Q",),
+    "ic": ("U",), "ics": ("U",), "chip": ("U",), "chips": ("U",),
+    "connector": ("J", "P"), "connectors": ("J", "P"),
+    "crystal": ("Y", "X"), "crystals": ("Y", "X"),
+    "fuse": ("F",), "fuses": ("F",),
+    "switch": ("SW", "S"), "switches": ("SW", "S"),
+}
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_+\-./]+")
+_DESIGNATOR_RE = re.compile(r"^([A-Za-z]{1,4})\d+[A-Za-z]?$")
+
+# Longest run of query words tried as one name ("usb dp" -> USB_DP)
+MAX_PHRASE_WORDS = 3
+
+
+def _normalize(text: str) -> str:
+    """Index key: lowercase, "_" and whitespace runs as one space"""
+    return re.sub(r"[\s_]+", " ", text.lower()).strip()
+
+
+def _trigrams(key: str) -> Set[str]:
+    # No padded boundary grams: "  r" would be shared by every key starting with r
+    return {key[i:i + 3] for i in range(len(key) - 2)} or {key}
+
+
+def _parameter_values(params) -> Iterable[str]:
+    if isinstance(params, list):
+        for param in params:
+            if isinstance(param, dict) and param.get("value"):
+                yield str(param["value"])
+    elif isinstance(params, dict):
+        for value in params.values():
+            if value:
+                yield str(value)
+
+
+class DesignIndex:
+    """
+    Exact, prefix and trigram-fuzzy index over one document's entities.
+
+    Usage:
+        index = DesignIndex.from_document(pcb_info)
+        index.search("where is C168?")
+        index.with_designator_prefix("R")
+    """
+
+    def __init__(self):
+        self.entities: List[DesignEntity] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._designators: Dict[str, int] = {}
+        self._sorted_keys: List[str] = []
+        self._trigram_postings: Dict[str, Set[str]] = {}
+        self._trigram_counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_document(cls, document: Optional[Dict[str, Any]]) -> "DesignIndex":
+        """Index the components and nets of pcb_info or schematic_info"""
+        index = cls()
+        if not document:
+            return index
+
+        for comp in document.get("components", []) or []:
+            if isinstance(comp, dict):
+                name = comp.get("name") or comp.get("designator") or ""
+                fields = {
+                    "designator": name,
+                    "value": comp.get("value", ""),
+                    "footprint": comp.get("footprint", ""),
+                    "library_ref": comp.get("library_ref", "") or comp.get("lib_reference", ""),
+                }
+                for i, value in enumerate(_parameter_values(comp.get("parameters"))):
+                    fields[f"param{i}"] = value
+            else:
+                name = str(comp)
+                fields = {"designator": name}
+            index.add(DesignEntity("component", name, comp, {k: str(v) for k, v in fields.items() if v}))
+
+        for net in document.get("nets", []) or []:
+            name = net.get("name", "") if isinstance(net, dict) else str(net)
+            if name:
+                index.add(DesignEntity("net", name, net, {"net": name}))
+
+        index._finalize()
+        return index
+
+    def add(self, entity: DesignEntity):
+        """Add an entity (call _finalize() after the last add)"""
+        entity_id = len(self.entities)
+        self.entities.append(entity)
+        if entity.kind == "component" and entity.name:
+            self._designators.setdefault(entity.name.upper(), entity_id)
+        for value in entity.fields.values():
+            key = _normalize(value)
+            if key:
+                self._postings.setdefault(key, set()).add(entity_id)
+
+    def _finalize(self):
+        self._sorted_keys = sorted(self._postings)
+        self._trigram_postings = {}
+        self._trigram_counts = {}
+        for key in self._sorted_keys:
+            grams = _trigrams(key)
+            self._trigram_counts[key] = len(grams)
+            for gram in grams:
+                self._trigram_postings.setdefault(gram, set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def _entities(self, ids: Iterable[int]) -> List[DesignEntity]:
+        return [self.entities[i] for i in sorted(ids)]
+
+    def designator(self, name: str) -> Optional[DesignEntity]:
+        """Component by exact designator (case-insensitive)"""
+        entity_id = self._designators.get(name.upper())
+        return self.entities[entity_id] if entity_id is not None else None
+
+    def exact(self, term: str) -> List[DesignEntity]:
+        """Entities with any field equal to term (case-insensitive, "_" == " ")"""
+        return self._entities(self._postings.get(_normalize(term), ()))
+
+    def prefix(self, term: str, limit: int = 50) -> List[DesignEntity]:
+        """Entities with any field starting with term"""
+        term = _normalize(term)
+        ids: Set[int] = set()
+        position = bisect.bisect_left(self._sorted_keys, term)
+        while position < len(self._sorted_keys) and len(ids) < limit:
+            key = self._sorted_keys[position]
+            if not key.startswith(term):
+                break
+            ids.update(self._postings[key])
+            position += 1
+        return self._entities(ids)[:limit]
+
+    def fuzzy(self, term: str, limit: int = 10, min_similarity: float = 0.5) -> List[DesignEntity]:
+        """
+        Entities with a field similar to term (trigram Jaccard similarity).
+        Designator-shaped terms only match exactly.
+        """
+        if self._is_designator(term):
+            return self.exact(term)[:limit]
+        grams = _trigrams(_normalize(term))
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigram_postings.get(gram, ()))
+
+        scored = []
+        for key, common in shared.items():
+            similarity = common / (len(grams) + self._trigram_counts[key] - common)
+            if similarity >= min_similarity:
+                scored.append((similarity, key))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        ids: List[int] = []
+        for _, key in scored:
+            for entity_id in sorted(self._postings[key]):
+                if entity_id not in ids:
+                    ids.append(entity_id)
+            if len(ids) >= limit:
+                break
+        return [self.entities[i] for i in ids[:limit]]
+
+    def with_designator_prefix(self, prefix: str, limit: int = 200) -> List[DesignEntity]:
+        """Components whose designator is prefix followed by a number (R -> R1, R22)"""
+        pattern = re.compile(rf"^{re.escape(prefix)}\d", re.IGNORECASE)
+        return [e for e in self.prefix(prefix, limit=limit * 4)
+                if e.kind == "component" and pattern.match(e.name)][:limit]
+
+    def search(self, query: str, limit: int = 10) -> List[DesignEntity]:
+        """
+        Entities named in a free-text query.
+
+        Runs of up to MAX_PHRASE_WORDS terms are tried as one name first
+        ("USB DP" -> USB_DP), then exact matches on each term; terms without
+        an exact match that look like identifiers (contain a digit, '_' or
+        uppercase) fall back to prefix lookup (STM32 -> STM32F103), then
+        fuzzy lookup.
+        """
+        results: List[DesignEntity] = []
+        seen: Set[int] = set()
+
+        def take(entities: List[DesignEntity]):
+            for entity in entities:
+                if id(entity) not in seen and len(results) < limit:
+                    seen.add(id(entity))
+                    results.append(entity)
+
+        terms = [token.strip(".-/") for token in _TOKEN_RE.findall(query)]
+        position = 0
+        while position < len(terms) and len(results) < limit:
+            for size in range(min(MAX_PHRASE_WORDS, len(terms) - position), 1, -1):
+                words = terms[position:position + size]
+                if any(not w or w.lower() in STOPWORDS for w in words):
+                    continue
+                matches = self.exact(" ".join(words))
+                if matches:
+                    take(matches)
+                    position += size
+                    break
+            else:
+                term = terms[position]
+                position += 1
+                if len(term) >= 2 and term.lower() not in STOPWORDS:
+                    self._search_term(term, take)
+        return results
+
+    def _search_term(self, term: str, take: Callable[[List[DesignEntity]], None]):
+        """Exact matches for one query term, else prefix or fuzzy ones for identifier-like terms"""
+        matches = self.exact(term)
+        if matches:
+            take(matches)
+        elif self._is_designator(term):
+            return  # Exact only (see fuzzy)
+        elif any(c.isdigit() or c == "_" for c in term) or term[1:] != term[1:].lower():
+            take(self.prefix(term, limit=3) or self.fuzzy(term, limit=3))
+
+    def _is_designator(self, term: str) -> bool:
+        """Whether term looks like a designator of this board (R12: there are R<n> parts)"""
+        match = _DESIGNATOR_RE.match(term)
+        return bool(match) and bool(self.with_designator_prefix(match.group(1), limit=1))
@@ -0,0 +1,224 @@
+"""
+Local Intent Classifier - Fast Path Ahead of the LLM Intent Call
+
+Classifies chat turns into orchestrator actions (analyze, strategy, review,
+generate_layout, execute, answer) without a network round trip:
+- Regex rules for the phrasings the intent prompt already documents
+- Word unigram/bigram similarity to per-action exemplar centroids
+- Trainable from logged (query, action) pairs decided by the LLM intent call
+- Questions ("how do I generate a layout?") weaken the action rules, and
+  generate_layout / execute are only decided locally for imperative requests
+  since they write files or change the design
+
+Returns an intent dict plus a confidence score in microseconds; the
+orchestrator only calls the LLM when confidence is low.
+"""
+import re
+import json
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, Tuple, Iterable
+from config import INTENT_LOG_PATH
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+ACTIONS = ["analyze", "strategy", "review", "generate_layout", "execute", "answer"]
+
+# (pattern, action, weight) - mirrors the examples in the intent system prompt
+INTENT_RULES = [
+    (r"\banaly[sz]e\b.*\b(schematic|design|board|pcb|circuit)\b", "analyze", 0.9),
+    (r"\bfunctional blocks?\b", "analyze", 0.85),
+    (r"\b(identify|find|list)\b.*\b(high[- ]speed|critical|differential)\b", "analyze", 0.85),
+    (r"\bsignal (paths?|analysis|integrity)\b", "analyze", 0.75),
+    (r"\bplacement (strategy|plan|recommendations?)\b", "strategy", 0.9),
+    (r"\bhow should i (place|arrange|position)\b", "strategy", 0.85),
+    (r"\bsuggest\b.*\bplacement\b", "strategy", 0.85),
+    (r"\bwhere should\b.*\b(go|place|put)\b", "strategy", 0.7),
+    (r"\breview\b.*\b(design|schematic|board|pcb|layout)\b", "review", 0.9),
+    (r"\b(any|potential|design) (issues|problems|mistakes)\b", "review", 0.85),
+    (r"\bwhat'?s missing\b", "review", 0.85),
+    (r"\bgenerate (a |the )?(pcb )?layout\b", "generate_layout", 0.95),
+    (r"\b(create|generate|make) (an? |the )?initial placement\b", "generate_layout", 0.9),
+    (r"\bplace all components\b", "generate_layout", 0.9),
+    (r"\bauto[- ]?(place|layout|placement)\b", "generate_layout", 0.9),
+    (r"\b(move|rotate|remove|delete)\b\s+[a-z]{1,3}\d+\b", "execute", 0.85),
+    (r"\b(change|set)\b.*\b[a-z]{1,3}\d+\b.*\b(to|value)\b", "execute", 0.75),
+    (r"\b(create|new) (a )?(new )?project\b", "execute", 0.85),
+    (r"^(what|which|how many|where|is|are|does|do|can|why)\b", "answer", 0.45),
+]
+
+# Queries opening like a question: action rules only count for this share of their weight
+QUESTION_RE = re.compile(
+    r"^\s*(how|what|what's|why|when|which|who|where|is|are|does|do|did|can|could|would|should|will)\b",
+    re.IGNORECASE)
+QUESTION_RULE_FACTOR = 0.5
+
+# Actions with side effects, never decided locally for a question
+SIDE_EFFECT_ACTIONS = ("generate_layout", "execute")
+
+# Seed exemplars (the examples from the intent prompt and common variants)
+SEED_EXAMPLES = [
+    ("Analyze this schematic", "analyze"),
+    ("What are the functional blocks?", "analyze"),
+    ("Identify high-speed signals", "analyze"),
+    ("Break down the circuit into blocks", "analyze"),
+    ("Generate placement strategy", "strategy"),
+    ("How should I place these components?", "strategy"),
+    ("Suggest placement for power supply", "strategy"),
+    ("Where should the crystal go?", "strategy"),
+    ("Review this design", "review"),
+    ("Are there any issues?", "review"),
+    ("What's missing in this design?", "review"),
+    ("Check my design for problems", "review"),
+    ("Generate layout", "generate_layout"),
+    ("Create initial placement", "generate_layout"),
+    ("Place all components automatically", "generate_layout"),
+    ("Auto-place the board", "generate_layout"),
+    ("Move R1 to 50, 30", "execute"),
+    ("Rotate U1 by 90 degrees", "execute"),
+    ("Change the value of R5 to 10k", "execute"),
+    ("Create a new project called Demo", "execute"),
+    ("How many components are on the board?", "answer"),
+    ("What is the board size?", "answer"),
+    ("Where is C168 located?", "answer"),
+    ("List all resistors", "answer"),
+]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str) -> Counter:
+    """Word unigrams and bigrams"""
+    words = _WORD_RE.findall(text.lower())
+    features = Counter(words)
+    features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return features
+
+
+def _normalize(vector: Counter) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+
+def is_question(query: str) -> bool:
+    """Whether a query is phrased as a question rather than an instruction"""
+    return bool(QUESTION_RE.match(query)) or query.rstrip().endswith("?")
+
+
+def guess_analysis_type(query: str) -> str:
+    """analysis_type of an analyze query, by keywords"""
+    signal_words = ("signal", "high-speed", "high speed", "differential", "clock")
+    return "signal_paths" if any(w in query.lower() for w in signal_words) else "functional_blocks"
+
+
+class LocalIntentClassifier:
+    """
+    Keyword/regex/n-gram intent classifier.
+
+    Usage:
+        classifier = LocalIntentClassifier()
+        intent, confidence = classifier.classify("Review this design")
+        if confidence < INTENT_LOCAL_CONFIDENCE:
+            ...  # ask the LLM
+    """
+
+    def __init__(self, log_path: str = INTENT_LOG_PATH):
+        self.log_path = Path(log_path) if log_path else None
+        self.rules = [(re.compile(p, re.IGNORECASE), action, weight) for p, action, weight in INTENT_RULES]
+        self._sums: Dict[str, Counter] = {action: Counter() for action in ACTIONS}
+        self._centroids: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+        self.train(SEED_EXAMPLES)
+        if self.log_path and self.log_path.exists():
+            self.train_from_log(self.log_path)
+
+    def train(self, examples: Iterable[Tuple[str, str]]):
+        """Add (query, action) examples to the action centroids"""
+        with self._lock:
+            for query, action in examples:
+                if action in self._sums and query:
+                    for key, value in _normalize(_features(query)).items():
+                        self._sums[action][key] += value
+            self._centroids = {action: _normalize(vec) for action, vec in self._sums.items() if vec}
+
+    def train_from_log(self, path) -> int:
+        """Train from a JSONL log of {"query", "action"} records"""
+        examples = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    examples.append((entry.get("query", ""), entry.get("action", "")))
+        except OSError as e:
+            logger.error(f"Could not read intent log {path}: {e}")
+            return 0
+        self.train(examples)
+        logger.info(f"Intent classifier trained on {len(examples)} logged queries")
+        return len(examples)
+
+    def log_query(self, query: str, action: str):
+        """Append an LLM-decided intent to the training log and learn from it"""
+        if action not in self._sums:
+            return
+        self.train([(query, action)])
+        if not self.log_path:
+            return
+        try:
+            with self._lock:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"query": query, "action": action}) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write intent log: {e}")
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Score every action in [0, 1]"""
+        scores = {action: 0.0 for action in ACTIONS}
+        question = is_question(query)
+
+        for pattern, action, weight in self.rules:
+            if pattern.search(query):
+                if question and action != "answer":
+                    weight *= QUESTION_RULE_FACTOR
+                scores[action] = max(scores[action], weight)
+
+        features = _normalize(_features(query))
+        for action, centroid in self._centroids.items():
+            similarity = sum(v * centroid.get(k, 0.0) for k, v in features.items())
+            # Combine as independent evidence
+            scores[action] = 1 - (1 - scores[action]) * (1 - min(1.0, similarity))
+
+        return scores
+
+    def classify(self, query: str) -> Tuple[Dict[str, Any], float]:
+        """
+        Classify a query.
+
+        Returns:
+            (intent dict in the _determine_intent format, confidence 0-1)
+        """
+        scores = self.score(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (action, top), (_, second) = ranked[0], ranked[1]
+        confidence = max(0.0, min(1.0, top - 0.5 * second))
+        if action in SIDE_EFFECT_ACTIONS and is_question(query):
+            confidence = 0.0  # "How do I generate a layout?" - let the LLM decide
+
+        intent: Dict[str, Any] = {
+            "action": action,
+            "reasoning": query,
+            "response": None,
+            "source": "local",
+            "confidence": round(confidence, 3)
+        }
+        if action == "analyze":
+            intent["analysis_type"] = guess_analysis_type(query)
+        return intent, confidence
@@ -0,0 +1,243 @@
+"""
+Job Manager - Background Jobs for Long-Running Agent Actions
+
+Layout generation, full analysis and review run as jobs on a worker pool.
+The chat turn waits for its job (one turn at a time), but the job gets:
+- Every job has an id, a status and a result kept after it finishes
+  (the most recent JOB_RESULT_RETENTION finished jobs are retained)
+- Jobs report progress by stage; subscribers (the UI) receive each event
+- Cancellation is cooperative: the job checks its JobContext between stages
+  and stops with JobCancelled. Each job runs under its own CancellationToken
+  (a child of the submitter's), so LLM and Altium calls inside it are
+  aborted too, and cancelling the chat turn cancels its jobs
+
+Jobs receive their JobContext as the `job` keyword argument.
+"""
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+from config import JOB_MAX_WORKERS, JOB_RESULT_RETENTION
+from cancellation import CancellationToken, OperationCancelled, current_token, use_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobCancelled(OperationCancelled):
+    """Raised inside a job when its cancellation was requested"""
+
+
+@dataclass
+class JobEvent:
+    """Progress or status change of one job"""
+    job_id: str
+    name: str
+    status: JobStatus
+    stage: str = ""
+    progress: Optional[float] = None  # 0..1 when known
+    message: str = ""
+    timestamp: float = field(default_factory=time.time)
+
+
+class Job:
+    """A submitted unit of work and its outcome"""
+
+    def __init__(self, job_id: str, name: str, parent: Optional[CancellationToken] = None):
+        self.id = job_id
+        self.name = name
+        self.status = JobStatus.QUEUED
+        self.stage = ""
+        self.progress: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.token = CancellationToken(parent)
+        self._done = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.token.cancelled
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the job finishes.
+
+        Returns:
+            The job's result (None if cancelled or still running at timeout)
+
+        Raises:
+            The job's exception if it failed
+        """
+        self._done.wait(timeout)
+        if self.status == JobStatus.FAILED and self.error is not None:
+            raise self.error
+        return self.result
+
+    def __repr__(self) -> str:
+        return f"Job({self.id}, {self.name}, {self.status.value})"
+
+
+class JobContext:
+    """Handle a running job uses to report progress and check for cancellation"""
+
+    def __init__(self, manager: "JobManager", job: Job):
+        self._manager = manager
+        self.job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self.job.cancel_requested
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self.job.cancel_requested:
+            raise JobCancelled(self.job.id)
+
+    def progress(self, stage: str, progress: Optional[float] = None, message: str = ""):
+        """Report entering/finishing a stage (also a cancellation point)"""
+        self.check_cancelled()
+        self.job.stage = stage
+        if progress is not None:
+            self.job.progress = max(0.0, min(1.0, progress))
+        self._manager._publish(self.job, message)
+
+
+class JobManager:
+    """
+    Worker pool running jobs with progress, cancellation and result retention.
+
+    Usage:
+        jobs = JobManager()
+        unsubscribe = jobs.subscribe(lambda event: print(event.stage, event.progress))
+        job = jobs.submit("layout", generate_layout, query, context)
+        result = job.wait()
+        jobs.cancel(job.id)
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, retention: int = JOB_RESULT_RETENTION):
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._subscribers: List[tuple] = []  # (job_id or None, callback)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue func(*args, job=JobContext, **kwargs) and return its Job"""
+        with self._lock:
+            job = Job(f"{name}-{next(self._ids)}", name, parent=current_token())
+            self._jobs[job.id] = job
+        self._publish(job)
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, active_only: bool = False) -> List[Job]:
+        """Known jobs, oldest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in jobs if j.status not in FINISHED] if active_only else jobs
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; False if the job is unknown or already finished"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.token.cancel(f"job {job.id} cancelled")
+        logger.info(f"Cancellation requested: {job.id}")
+        return True
+
+    def subscribe(self, callback: Callable[[JobEvent], None], job_id: Optional[str] = None) -> Callable[[], None]:
+        """
+        Receive events of one job (or all jobs). Callbacks run on the job's
+        worker thread and must not block.
+
+        Returns:
+            Function that removes the subscription
+        """
+        entry = (job_id, callback)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def shutdown(self, cancel_running: bool = True):
+        """Stop accepting jobs; optionally cancel those still running"""
+        if cancel_running:
+            for job in self.jobs(active_only=True):
+                self.cancel(job.id)
+        self._pool.shutdown(wait=False)
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        if job.cancel_requested:
+            self._finish(job, JobStatus.CANCELLED)
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        self._publish(job)
+        try:
+            with use_token(job.token):
+                job.result = func(*args, job=JobContext(self, job), **kwargs)
+            self._finish(job, JobStatus.SUCCEEDED)
+        except OperationCancelled:
+            self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = e
+            self._finish(job, JobStatus.FAILED, str(e))
+
+    def _finish(self, job: Job, status: JobStatus, message: str = ""):
+        job.status = status
+        job.finished_at = time.time()
+        if status == JobStatus.SUCCEEDED:
+            job.progress = 1.0
+        job._done.set()
+        self._publish(job, message)
+        self._evict()
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+            for job_id in finished[:max(0, len(finished) - self.retention)]:
+                del self._jobs[job_id]
+
+    def _publish(self, job: Job, message: str = ""):
+        event = JobEvent(job.id, job.name, job.status, job.stage, job.progress, message)
+        with self._lock:
+            callbacks = [cb for job_id, cb in self._subscribers if job_id in (None, job.id)]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Job subscriber failed: {e}")
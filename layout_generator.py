@@ -12,8 +12,9 @@ This is the core intelligence that enables autonomous layout generation.
 import json
 import math
 from typing import Dict, List, Any, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from enum import Enum
+from results_cache import ResultsCache, canonical_hash
 
 
 class BoardZone(Enum):
@@ -257,20 +258,52 @@ class LayoutGenerator:
         else:
             return (3.0, 3.0)  # Default
     
+    def settings(self) -> Dict[str, Any]:
+        """Generator settings that affect placement (part of the results cache key)"""
+        return {
+            "board": [self.board_width, self.board_height],
+            "margin": self.margin,
+            "spacing": self.component_spacing,
+            "zones": {bt.value: zone.value for bt, zone in self.zone_assignments.items()},
+        }
+    
     def generate_layout(self, components: List[Dict], 
-                       functional_blocks: List[Dict] = None) -> List[ComponentPlacement]:
+                       functional_blocks: List[Dict] = None,
+                       cache: Optional[ResultsCache] = None) -> List[ComponentPlacement]:
         """
         Generate component placements from schematic data.
         
         Args:
             components: List of component dicts with designator, value, footprint, etc.
-            functional_blocks: Optional pre-analyzed functional blocks
+            functional_blocks: Optional pre-analyzed functional blocks; their
+                type overrides the rule-based classification of their components
+            cache: Optional results cache; placements for the same components,
+                blocks and settings are reused instead of recomputed
             
         Returns:
             List of ComponentPlacement objects with X,Y coordinates
         """
+        if cache is not None:
+            key = canonical_hash(components, functional_blocks, self.settings())
+            cached = cache.get("layout", key)
+            if cached is not None:
+                self.placements = [ComponentPlacement(**p) for p in cached]
+                return self.placements
+            self.generate_layout(components, functional_blocks)
+            cache.put("layout", key, [asdict(p) for p in self.placements])
+            return self.placements
+        
         self.placements = []
         
+        # Block type assigned by the functional block analysis, if any
+        analyzed_types: Dict[str, BlockType] = {}
+        block_types = {bt.value: bt for bt in BlockType}
+        for block in functional_blocks or []:
+            block_type = block_types.get(str(block.get("type", "")).lower())
+            if block_type:
+                for designator in block.get("components", []):
+                    analyzed_types.setdefault(str(designator).upper(), block_type)
+        
         # Group components by functional block type
         component_groups: Dict[BlockType, List[Dict]] = {bt: [] for bt in BlockType}
         
@@ -280,7 +313,8 @@ class LayoutGenerator:
             description = comp.get("description", "")
             footprint = comp.get("footprint", "")
             
-            block_type = self.classify_component(designator, value, description, footprint)
+            block_type = analyzed_types.get(designator.upper()) \
+                or self.classify_component(designator, value, description, footprint)
             component_groups[block_type].append(comp)
         
         # Place components by zone
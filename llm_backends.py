@@ -0,0 +1,261 @@
+"""
+LLM Backends - Pluggable Transport for LLMClient
+
+Backends perform the actual completion requests for LLMClient:
+- OpenAIBackend: live calls through the OpenAI SDK
+- RecordingBackend: wraps another backend and appends every request/response
+  pair (including per-chunk stream timing) to a JSONL corpus
+- ReplayBackend: answers from a recorded corpus deterministically, optionally
+  reproducing the recorded latencies
+
+Record once against OpenAI, then replay in CI or on air-gapped machines to
+measure orchestrator overhead without network or API cost.
+
+Backends fill the optional `usage` dict with prompt_tokens/completion_tokens
+(and cached_tokens) when the provider reports them (used by llm_metrics).
+
+Streams honour the current CancellationToken: a cancelled stream is closed
+(ending the HTTP response, so the provider stops generating) and raises
+OperationCancelled.
+"""
+import json
+import time
+import hashlib
+import threading
+import httpx
+from openai import OpenAI
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+from cancellation import OperationCancelled, current_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(model: str, messages: list, temperature: float) -> str:
+    """Canonical hash identifying a completion request"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class OpenAIBackend:
+    """Live OpenAI chat completions"""
+
+    def __init__(self, api_key: str, timeout: float = 60.0):
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not set in environment variables")
+
+        # Create custom HTTP client that bypasses system proxy
+        http_client = httpx.Client(
+            trust_env=False,  # Don't use system proxy settings
+            timeout=timeout,
+        )
+        # Retries are left to LLMScheduler so a 429 pauses every request, not just one
+        # (it also retries 5xx, timeouts and dropped connections - see is_transient_error)
+        self.client = OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+    def _client(self, timeout: Optional[float]):
+        return self.client.with_options(timeout=timeout) if timeout else self.client
+    
+    @staticmethod
+    def _fill_usage(usage: Optional[Dict[str, Any]], reported):
+        if usage is None or reported is None:
+            return
+        usage["prompt_tokens"] = reported.prompt_tokens
+        usage["completion_tokens"] = reported.completion_tokens
+        # Prompt tokens served from the provider's prefix cache
+        details = getattr(reported, "prompt_tokens_details", None)
+        usage["cached_tokens"] = getattr(details, "cached_tokens", None) or 0
+
+    def complete(self, model: str, messages: list, temperature: float,
+                 usage: Dict[str, Any] = None, timeout: float = None) -> Optional[str]:
+        """Return the full completion text (timeout: per-request budget in seconds)"""
+        response = self._client(timeout).chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature
+        )
+        self._fill_usage(usage, response.usage)
+        return response.choices[0].message.content
+
+    def stream(self, model: str, messages: list, temperature: float,
+               usage: Dict[str, Any] = None, timeout: float = None) -> Iterator[str]:
+        """Yield completion text chunks as they arrive"""
+        stream = self._client(timeout).chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        token = current_token()
+        # Closing from the cancelling thread also unblocks a read waiting for the next chunk
+        unregister = token.on_cancel(stream.close) if token else None
+        try:
+            for chunk in stream:
+                if token:
+                    token.raise_if_cancelled()
+                if chunk.usage:
+                    # Final chunk carries usage and no choices
+                    self._fill_usage(usage, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            if token and token.cancelled:
+                raise OperationCancelled(token.reason)  # Read failed because we closed it
+            raise
+        finally:
+            if unregister:
+                unregister()
+            stream.close()
+
+
+class RecordingBackend:
+    """Pass-through backend that records every exchange to a JSONL corpus"""
+
+    def __init__(self, inner, corpus_path: str):
+        self.inner = inner
+        self.corpus_path = Path(corpus_path)
+        self.corpus_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            with open(self.corpus_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def complete(self, model: str, messages: list, temperature: float,
+                 usage: Dict[str, Any] = None, timeout: float = None) -> Optional[str]:
+        start = time.perf_counter()
+        usage = usage if usage is not None else {}
+        response = self.inner.complete(model, messages, temperature, usage=usage, timeout=timeout)
+        self._write({
+            "key": request_key(model, messages, temperature),
+            "kind": "chat",
+            "request": {"model": model, "messages": messages, "temperature": temperature},
+            "response": response,
+            "usage": usage,
+            "latency_s": round(time.perf_counter() - start, 4),
+            "recorded_at": time.time()
+        })
+        return response
+
+    def stream(self, model: str, messages: list, temperature: float,
+               usage: Dict[str, Any] = None, timeout: float = None) -> Iterator[str]:
+        start = time.perf_counter()
+        usage = usage if usage is not None else {}
+        chunks = []
+        completed = False
+        try:
+            for text in self.inner.stream(model, messages, temperature, usage=usage, timeout=timeout):
+                chunks.append({"t": round(time.perf_counter() - start, 4), "text": text})
+                yield text
+            completed = True
+        finally:
+            # Partial streams (caller stopped early) are still worth recording
+            self._write({
+                "key": request_key(model, messages, temperature),
+                "kind": "stream",
+                "request": {"model": model, "messages": messages, "temperature": temperature},
+                "response": "".join(c["text"] for c in chunks),
+                "chunks": chunks,
+                "complete": completed,
+                "usage": usage,
+                "latency_s": round(time.perf_counter() - start, 4),
+                "recorded_at": time.time()
+            })
+
+
+class ReplayBackend:
+    """
+    Deterministic backend answering from a recorded corpus.
+
+    Identical requests recorded several times are replayed in recording order,
+    cycling when exhausted. Unrecorded requests raise KeyError (LLMClient turns
+    that into its usual None response).
+    """
+
+    def __init__(self, corpus_path: str, reproduce_latency: bool = False):
+        self.corpus_path = Path(corpus_path)
+        self.reproduce_latency = reproduce_latency
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.corpus_path.exists():
+            logger.warning(f"Replay corpus not found: {self.corpus_path}")
+            return
+        with open(self.corpus_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in self.entries.values())} recorded LLM exchanges")
+
+    def _next_entry(self, model: str, messages: list, temperature: float) -> Dict[str, Any]:
+        key = request_key(model, messages, temperature)
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                raise KeyError(f"No recorded response for request {key[:12]}")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = (index + 1) % len(recorded)
+            return recorded[index]
+
+    @staticmethod
+    def _sleep(seconds: float):
+        """Simulated latency that ends early (raising) when the current token is cancelled"""
+        token = current_token()
+        if token is None:
+            time.sleep(seconds)
+        elif token.wait(seconds):
+            raise OperationCancelled(token.reason)
+
+    def complete(self, model: str, messages: list, temperature: float,
+                 usage: Dict[str, Any] = None, timeout: float = None) -> Optional[str]:
+        entry = self._next_entry(model, messages, temperature)
+        if usage is not None:
+            usage.update(entry.get("usage") or {})
+        if self.reproduce_latency:
+            self._sleep(entry.get("latency_s", 0))
+        return entry.get("response")
+
+    def stream(self, model: str, messages: list, temperature: float,
+               usage: Dict[str, Any] = None, timeout: float = None) -> Iterator[str]:
+        entry = self._next_entry(model, messages, temperature)
+        if usage is not None:
+            usage.update(entry.get("usage") or {})
+        chunks = entry.get("chunks")
+        if chunks is None:
+            # Recorded as a plain chat call - replay as a single chunk
+            chunks = [{"t": entry.get("latency_s", 0), "text": entry.get("response") or ""}]
+
+        start = time.perf_counter()
+        for chunk in chunks:
+            if self.reproduce_latency:
+                delay = chunk["t"] - (time.perf_counter() - start)
+                if delay > 0:
+                    self._sleep(delay)
+            yield chunk["text"]
+
+
+def create_backend(kind: str, api_key: str = "", corpus_path: str = "llm_corpus.jsonl",
+                   reproduce_latency: bool = False):
+    """Create a backend by name: 'openai', 'record' or 'replay'"""
+    kind = (kind or "openai").lower()
+    if kind == "replay":
+        return ReplayBackend(corpus_path, reproduce_latency=reproduce_latency)
+    if kind == "record":
+        return RecordingBackend(OpenAIBackend(api_key), corpus_path)
+    return OpenAIBackend(api_key)
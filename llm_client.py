@@ -1,10 +1,22 @@
 """
 OpenAI LLM Client for Agent Capabilities
 """
-from openai import OpenAI
-import httpx
-from typing import Optional, Dict, Any, Iterator
-from config import OPENAI_API_KEY, OPENAI_MODEL
+import time
+from typing import Optional, Dict, Any, Iterator, List, Callable, Iterable, Union
+from config import (
+    OPENAI_API_KEY, OPENAI_MODEL, LLM_MAX_CONCURRENCY,
+    LLM_BACKEND, LLM_CORPUS_PATH, LLM_REPLAY_LATENCY, LLM_COMPLETION_TOKEN_ESTIMATE
+)
+from llm_backends import create_backend, request_key
+from single_flight import SingleFlight
+from cancellation import CancellationToken, OperationCancelled, current_token, resolve_token
+from llm_scheduler import RequestPriority, get_default_scheduler, is_rate_limit_error
+from context_packer import estimate_tokens
+from llm_metrics import LLMCallRecord, get_metrics, estimate_cost
+from model_router import ModelRouter, Route, is_timeout_error
+from streaming_json import StreamingJSONParser, extract_json
+from prompts import COMMAND_SYSTEM_PROMPT
+from stage_graph import StageGraph
 import logging
 
 # Setup logging
@@ -15,75 +27,330 @@ logger = logging.getLogger(__name__)
 class LLMClient:
     """Client for OpenAI API integration"""
     
-    def __init__(self):
-        if not OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY not set in environment variables")
-        
-        # Create custom HTTP client that bypasses system proxy
-        http_client = httpx.Client(
-            trust_env=False,  # Don't use system proxy settings
-            timeout=60.0,     # 60 second timeout
-        )
-        
-        self.client = OpenAI(
+    def __init__(self, backend=None, scheduler=None, router=None):
+        """
+        Args:
+            backend: Optional transport (see llm_backends.py). Defaults to the
+                backend selected by LLM_BACKEND (live OpenAI unless configured
+                to record or replay a corpus).
+            scheduler: Optional LLMScheduler; defaults to the process-wide one
+            router: Optional ModelRouter mapping stages to models and budgets
+        """
+        self.backend = backend or create_backend(
+            LLM_BACKEND,
             api_key=OPENAI_API_KEY,
-            http_client=http_client
+            corpus_path=LLM_CORPUS_PATH,
+            reproduce_latency=LLM_REPLAY_LATENCY
         )
         self.model = OPENAI_MODEL
-        logger.info(f"LLM Client initialized with model: {self.model}")
+        self.scheduler = scheduler or get_default_scheduler()
+        self.router = router or ModelRouter()
+        # Identical concurrent requests share one underlying call
+        self._single_flight = SingleFlight()
+        logger.info(f"LLM Client initialized with model: {self.model} ({type(self.backend).__name__})")
+    
+    def _estimate_request_tokens(self, messages: list) -> int:
+        """Estimate prompt + completion tokens for rate budgeting"""
+        prompt = sum(estimate_tokens(str(m.get("content") or "")) + 4 for m in messages)
+        return prompt + LLM_COMPLETION_TOKEN_ESTIMATE
+    
+    def _record_call(self, stage: str, kind: str, started_at: float, start: float,
+                     first_chunk: Optional[float], messages: list, response_text: str,
+                     usage: Dict[str, Any], error: str = ""):
+        """Record latency, tokens and cost for one call"""
+        end = time.perf_counter()
+        model = usage.get("model", self.model)
+        coalesced = not usage.get("_leader", False)
+        if coalesced:
+            # Another caller's request paid for this response
+            prompt_tokens = completion_tokens = cached_tokens = 0
+        else:
+            cached_tokens = usage.get("cached_tokens") or 0
+            prompt_tokens = usage.get("prompt_tokens")
+            if prompt_tokens is None:
+                prompt_tokens = self._estimate_request_tokens(messages) - LLM_COMPLETION_TOKEN_ESTIMATE
+            completion_tokens = usage.get("completion_tokens")
+            if completion_tokens is None:
+                completion_tokens = estimate_tokens(response_text or "")
+        
+        get_metrics().record(LLMCallRecord(
+            stage=stage,
+            model=model,
+            kind=kind,
+            started_at=started_at,
+            latency_s=round(end - start, 4),
+            ttft_s=round(first_chunk - start, 4) if first_chunk is not None else None,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=round(estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens), 6),
+            success=not error,
+            coalesced=coalesced,
+            cached_tokens=cached_tokens,
+            error=error
+        ))
     
-    def chat(self, messages: list, temperature: float = 0.7) -> Optional[str]:
+    def chat(self, messages: list, temperature: float = 0.7,
+             priority: int = RequestPriority.INTERACTIVE, stage: str = "chat",
+             cancel_token: Optional[CancellationToken] = None) -> Optional[str]:
         """
         Send chat messages to OpenAI
         
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             temperature: Sampling temperature (0-2)
+            priority: Scheduling class (interactive, background, batch)
+            stage: Calling stage (intent, analyze, answer, ...) - selects the
+                model route and tags metrics
+            cancel_token: Defaults to the current turn's token
         
         Returns:
             Response text or None if error
+        
+        Raises:
+            OperationCancelled: If the token is cancelled before the response arrives
         """
+        token = resolve_token(cancel_token)
+        started_at = time.time()
+        start = time.perf_counter()
+        usage: Dict[str, Any] = {}
+        route = self.router.route(stage)
+        if route.temperature is not None:
+            temperature = route.temperature
+        
+        def call():
+            usage["_leader"] = True
+            return self._complete_routed(route, messages, temperature, usage, token)
+        
         try:
-            logger.info(f"Sending request to OpenAI ({len(messages)} messages)")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature
-            )
+            logger.info(f"Sending request to OpenAI ({len(messages)} messages, stage: {stage}, model: {route.model})")
+            key = "chat:" + request_key(route.model, messages, temperature)
+            tokens = self._estimate_request_tokens(messages)
+            response = self._single_flight.do(key, lambda: self.scheduler.run(
+                call, priority=priority, tokens=tokens, cancel_token=token
+            ), cancel_token=token)
+            if token:
+                # A blocking completion can't be aborted mid-request - drop its result
+                token.raise_if_cancelled()
             logger.info("OpenAI response received successfully")
-            return response.choices[0].message.content
+            self._record_call(stage, "chat", started_at, start, time.perf_counter(),
+                              messages, response, usage)
+            return response
+        except OperationCancelled:
+            logger.info(f"OpenAI request cancelled (stage: {stage})")
+            self._record_call(stage, "chat", started_at, start, None, messages, "", usage, error="cancelled")
+            raise
         except Exception as e:
             logger.error(f"Error calling OpenAI API: {e}")
             print(f"Error calling OpenAI API: {e}")
+            self._record_call(stage, "chat", started_at, start, None, messages, "", usage, error=str(e))
             return None
     
-    def chat_stream(self, messages: list, temperature: float = 0.7) -> Iterator[str]:
+    def gather_chats(self, requests: List[Union[list, Dict[str, Any]]],
+                     max_concurrency: int = LLM_MAX_CONCURRENCY) -> List[Optional[str]]:
+        """
+        Run several independent chat requests concurrently, so a multi-prompt
+        workflow takes as long as its slowest prompt instead of the sum.
+        Each request goes through chat() (scheduler, routing, metrics and the
+        current turn's cancellation and deadline).
+        
+        Args:
+            requests: Each item is either a messages list, or a dict of chat()
+                arguments ('messages' plus e.g. 'temperature', 'stage')
+            max_concurrency: Requests in flight at once
+        
+        Returns:
+            Response texts in the same order as requests (None for failures)
+        """
+        graph = StageGraph(max_workers=max(1, max_concurrency))
+        for i, request in enumerate(requests):
+            kwargs = request if isinstance(request, dict) else {"messages": request}
+            graph.add(f"chat_{i}", lambda kwargs=kwargs: self.chat(**kwargs))
+        results = graph.run() if requests else {}
+        return [results.get(f"chat_{i}") for i in range(len(requests))]
+    
+    def chat_stream(self, messages: list, temperature: float = 0.7,
+                    priority: int = RequestPriority.INTERACTIVE, stage: str = "chat",
+                    cancel_token: Optional[CancellationToken] = None) -> Iterator[str]:
         """
         Send chat messages to OpenAI with streaming
         
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             temperature: Sampling temperature (0-2)
+            priority: Scheduling class (interactive, background, batch)
+            stage: Calling stage (intent, analyze, answer, ...) - selects the
+                model route and tags metrics
+            cancel_token: Defaults to the current turn's token; cancelling it
+                stops the iteration and closes the stream once no other caller
+                shares it
         
         Yields:
             Text chunks as they arrive
+        
+        Raises:
+            OperationCancelled: If the token is cancelled while streaming
         """
+        token = resolve_token(cancel_token)
+        started_at = time.time()
+        start = time.perf_counter()
+        first_chunk = None
+        usage: Dict[str, Any] = {}
+        parts = []
+        error = ""
+        chunks = None
+        route = self.router.route(stage, streaming=True)
+        if route.temperature is not None:
+            temperature = route.temperature
         try:
-            logger.info(f"Sending streaming request to OpenAI ({len(messages)} messages)")
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                stream=True
+            logger.info(f"Sending streaming request to OpenAI ({len(messages)} messages, stage: {stage}, model: {route.model})")
+            key = "stream:" + request_key(route.model, messages, temperature)
+            tokens = self._estimate_request_tokens(messages)
+            timeout = self._deadline_timeout(route.max_latency_s, token)
+            chunks = self._single_flight.stream(
+                key, lambda: self._scheduled_stream(messages, route, temperature, priority, tokens, usage, timeout),
+                cancel_token=token
             )
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            for chunk in chunks:
+                if token:
+                    token.raise_if_cancelled()
+                if chunk:
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    parts.append(chunk)
+                    yield chunk
             logger.info("OpenAI streaming response completed")
+        except OperationCancelled:
+            error = "cancelled"
+            logger.info(f"OpenAI stream cancelled (stage: {stage})")
+            raise
         except Exception as e:
+            error = str(e)
             logger.error(f"Error calling OpenAI API (streaming): {e}")
             print(f"Error calling OpenAI API (streaming): {e}")
             yield None
+        finally:
+            if chunks is not None:
+                chunks.close()  # Leave the shared stream now, not at garbage collection
+            # Also runs when the caller stops reading early
+            self._record_call(stage, "stream", started_at, start, first_chunk,
+                              messages, "".join(parts), usage, error=error)
+    
+    @staticmethod
+    def _deadline_timeout(timeout: Optional[float], token: Optional[CancellationToken]) -> Optional[float]:
+        """Per-request timeout capped to the turn's remaining time budget"""
+        remaining = token.remaining() if token else None
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise TimeoutError("Turn deadline exceeded")
+        return min(timeout, remaining) if timeout else remaining
+    
+    def _complete_routed(self, route: Route, messages: list, temperature: float,
+                         usage: Dict[str, Any], token: Optional[CancellationToken] = None) -> Optional[str]:
+        """Complete on the route's model, retrying on its fallback when over budget"""
+        usage["model"] = route.model
+        timeout = self._deadline_timeout(route.max_latency_s, token)
+        start = time.perf_counter()
+        try:
+            response = self.backend.complete(route.model, messages, temperature,
+                                             usage=usage, timeout=timeout)
+        except Exception as e:
+            if not is_timeout_error(e) or timeout != route.max_latency_s:
+                raise  # Not a route overrun (or the turn's deadline cut it short)
+            self.router.observe(route, time.perf_counter() - start, timed_out=True)
+            if not route.fallback:
+                raise
+            logger.warning(f"Stage '{route.stage}' exceeded {route.max_latency_s}s on {route.model} "
+                           f"- retrying with {route.fallback}")
+            usage["model"] = route.fallback
+            return self.backend.complete(route.fallback, messages, temperature, usage=usage,
+                                         timeout=self._deadline_timeout(None, token))
+        self.router.observe(route, time.perf_counter() - start)
+        return response
+    
+    def _scheduled_stream(self, messages: list, route: Route, temperature: float, priority: int,
+                          tokens: int, usage: Dict[str, Any], timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Stream from the backend inside a scheduler slot, retrying 429s and
+        transient errors before the first chunk; timeout (the route's latency budget, capped by the turn's
+        deadline) applies to the first chunk.
+        Runs under the shared stream's token (see SingleFlight.stream).
+        """
+        usage["_leader"] = True
+        model = route.model
+        attempt = transient_attempt = 0
+        while True:
+            started = False
+            start = time.perf_counter()
+            try:
+                usage["model"] = model
+                with self.scheduler.slot(priority, tokens):
+                    for chunk in self.backend.stream(model, messages, temperature, usage=usage, timeout=timeout):
+                        if not started and timeout:
+                            self.router.observe(route, time.perf_counter() - start)
+                        started = True
+                        yield chunk
+                self.scheduler.report_success()
+                return
+            except Exception as e:
+                if not started and timeout and timeout == route.max_latency_s and is_timeout_error(e):
+                    self.router.observe(route, time.perf_counter() - start, timed_out=True)
+                    if route.fallback and model != route.fallback:
+                        logger.warning(f"Stage '{route.stage}' exceeded {timeout}s to first chunk on {model} "
+                                       f"- retrying with {route.fallback}")
+                        model, timeout = route.fallback, self._deadline_timeout(None, current_token())
+                        continue
+                if started:
+                    raise
+                if is_rate_limit_error(e) and attempt < self.scheduler.max_retries:
+                    self.scheduler.report_rate_limited(e)
+                    attempt += 1
+                elif self.scheduler.retry_transient(e, transient_attempt):
+                    transient_attempt += 1
+                else:
+                    raise
+    
+    def chat_json_stream(self, messages: list, array_keys: Iterable[str] = (),
+                         on_item: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                         temperature: float = 0.3,
+                         priority: int = RequestPriority.INTERACTIVE,
+                         stage: str = "chat",
+                         cancel_token: Optional[CancellationToken] = None) -> Optional[Dict[str, Any]]:
+        """
+        Stream a structured (JSON) response, emitting array elements as they close
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            array_keys: Keys of arrays whose elements should be emitted early
+                (e.g. "blocks", "board_zones", "placement_order")
+            on_item: Callback (array_key, item) -> None for each completed element
+            temperature: Sampling temperature (0-2)
+            priority: Scheduling class (interactive, background, batch)
+            stage: Calling stage for metrics
+            cancel_token: Defaults to the current turn's token
+        
+        Returns:
+            The complete JSON object, or None if none could be parsed
+        """
+        parser = StreamingJSONParser(array_keys)
+        
+        def emit(items):
+            for key, item in items:
+                if on_item:
+                    try:
+                        on_item(key, item)
+                    except Exception as e:
+                        logger.error(f"Error in structured stream callback: {e}")
+        
+        for chunk in self.chat_stream(messages, temperature=temperature, priority=priority, stage=stage,
+                                      cancel_token=cancel_token):
+            if chunk is None:
+                break
+            emit(parser.feed(chunk))
+            if parser.result is not None:
+                break
+        emit(parser.finish())
+        return parser.result
     
     def analyze_pcb_query(self, user_query: str, pcb_info: Dict[str, Any] = None) -> Optional[str]:
         """
@@ -116,7 +383,7 @@ class LLMClient:
                 "content": f"PCB Summary: {summary}"
             })
         
-        return self.chat(messages)
+        return self.chat(messages, stage="answer")
     
     def generate_modification_command(self, user_request: str, pcb_info: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
         """
@@ -129,48 +396,11 @@ class LLMClient:
         Returns:
             Dictionary with 'command' and 'parameters' or None
         """
-        system_prompt = """You are a PCB design assistant that converts user requests into structured MCP commands for Altium Designer.
-        Return your response as a JSON object with 'command' (string) and 'parameters' (dict) fields.
-        
-        Available commands:
-        
-        1. move_component - Move a component to a new position
-           {"command": "move_component", "parameters": {"component_id": "R1", "x_position": 100.0, "y_position": 200.0}}
-        
-        2. rotate_component - Rotate a component
-           {"command": "rotate_component", "parameters": {"component_id": "R1", "rotation": 90}}
-        
-        3. remove_component - Remove a component from PCB
-           {"command": "remove_component", "parameters": {"component_id": "R1"}}
-        
-        4. change_component_value (also accepts modify_component_value) - Change component value/parameter
-           {"command": "change_component_value", "parameters": {"component_id": "R1", "value": "22k"}}
-           Note: Use "component_id" or "component_name" for component identifier
-        
-        5. add_track - Add a track between two points
-           {"command": "add_track", "parameters": {"start_x": 10.0, "start_y": 20.0, "end_x": 50.0, "end_y": 20.0, "layer": "Top Layer", "width": 0.2}}
-        
-        6. add_via - Add a via at a location
-           {"command": "add_via", "parameters": {"x_position": 25.0, "y_position": 30.0, "size": 0.5, "hole_size": 0.2}}
-        
-        7. change_layer - Move component to different layer
-           {"command": "change_layer", "parameters": {"component_id": "R1", "layer": "Bottom Layer"}}
-        
-        8. add_component - Add a new component to PCB
-           {"command": "add_component", "parameters": {"component_id": "R200", "footprint": "RES-0805", "value": "10k", "x_position": 100.0, "y_position": 200.0, "layer": "Top Layer", "rotation": 0}}
-        
-        9. connect_net - Connect component pin to net
-           {"command": "connect_net", "parameters": {"component_id": "R1", "pin": "1", "net_name": "VCC"}}
-        
-        10. set_board_size - Change board dimensions
-            {"command": "set_board_size", "parameters": {"width_mm": 100.0, "height_mm": 80.0}}
-        
-        All coordinates are in millimeters (mm). Rotations are in degrees. Layer names: "Top Layer" or "Bottom Layer".
-        Always use "component_id" for component names. Use "x_position" and "y_position" for coordinates."""
         
+        # Static prompt first, then the board summary (stable across requests),
+        # then the request itself
         messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_request}
+            {"role": "system", "content": COMMAND_SYSTEM_PROMPT}
         ]
         
         if pcb_info:
@@ -180,17 +410,14 @@ class LLMClient:
             summary += f"{stats.get('component_count', 0)} components, "
             summary += f"{stats.get('net_count', 0)} nets"
             messages.append({
-                "role": "assistant",
+                "role": "system",
                 "content": f"PCB Summary: {summary}"
             })
         
-        response = self.chat(messages, temperature=0.3)
+        messages.append({"role": "user", "content": user_request})
+        
+        response = self.chat(messages, temperature=0.3, stage="command")
         
         if response:
-            try:
-                import json
-                return json.loads(response)
-            except:
-                return None
+            return extract_json(response)
         return None
-
@@ -0,0 +1,170 @@
+"""
+LLM Metrics - Per-Call Latency and Token Instrumentation
+
+Every LLMClient call is recorded with:
+- Calling stage (intent, analyze, strategy, review, command_response, answer, ...)
+- Time-to-first-token and total latency
+- Prompt/completion tokens, prompt-cache hits and estimated cost
+
+Records go to a rotating JSONL log and to an in-process aggregate that can
+be queried per stage and exported.
+"""
+import json
+import time
+import threading
+import logging
+from collections import deque
+from dataclasses import dataclass, asdict
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from config import LLM_METRICS_LOG
+
+logger = logging.getLogger(__name__)
+
+
+# USD per 1K tokens (prompt, completion). Unknown models are costed at 0.
+MODEL_PRICING = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+
+# Cached prompt tokens are billed at this fraction of the prompt price
+CACHED_PROMPT_PRICE_FACTOR = 0.5
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """Estimate the USD cost of a call"""
+    prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    billed_prompt = prompt_tokens - cached_tokens + cached_tokens * CACHED_PROMPT_PRICE_FACTOR
+    return billed_prompt / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+
+
+@dataclass
+class LLMCallRecord:
+    """One chat/chat_stream call"""
+    stage: str
+    model: str
+    kind: str  # "chat" or "stream"
+    started_at: float
+    latency_s: float
+    ttft_s: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    success: bool
+    coalesced: bool = False  # Served by another caller's in-flight request
+    cached_tokens: int = 0  # Prompt tokens served from the provider's prefix cache
+    error: str = ""
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LLMMetrics:
+    """
+    Collects LLMCallRecords in memory and in a rotating JSONL log.
+
+    Usage:
+        metrics = get_metrics()
+        metrics.summary()              # per-stage aggregate
+        metrics.export_json("out.json")
+    """
+
+    def __init__(self, log_path: str = LLM_METRICS_LOG, max_records: int = 5000):
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._log = None
+        if log_path:
+            self._log = self._create_log(log_path)
+
+    def _create_log(self, log_path: str) -> Optional[logging.Logger]:
+        """Dedicated logger writing one JSON object per line"""
+        try:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            call_log = logging.getLogger(f"llm_calls.{id(self)}")
+            call_log.setLevel(logging.INFO)
+            call_log.propagate = False
+            call_log.addHandler(handler)
+            return call_log
+        except OSError as e:
+            logger.error(f"Could not open LLM metrics log {log_path}: {e}")
+            return None
+
+    def record(self, record: LLMCallRecord):
+        """Store a call record"""
+        with self._lock:
+            self.records.append(record)
+        if self._log:
+            self._log.info(json.dumps(asdict(record)))
+
+    def summary(self, stage: str = None) -> Dict[str, Dict[str, Any]]:
+        """Aggregate records per stage (or for one stage)"""
+        with self._lock:
+            records = [r for r in self.records if stage is None or r.stage == stage]
+
+        by_stage: Dict[str, List[LLMCallRecord]] = {}
+        for r in records:
+            by_stage.setdefault(r.stage, []).append(r)
+
+        summary = {}
+        for name, calls in by_stage.items():
+            latencies = [c.latency_s for c in calls]
+            ttfts = [c.ttft_s for c in calls if c.ttft_s is not None]
+            summary[name] = {
+                "calls": len(calls),
+                "errors": sum(1 for c in calls if not c.success),
+                "coalesced": sum(1 for c in calls if c.coalesced),
+                "latency_p50_s": round(_percentile(latencies, 50), 3),
+                "latency_p95_s": round(_percentile(latencies, 95), 3),
+                "ttft_p50_s": round(_percentile(ttfts, 50), 3) if ttfts else None,
+                "prompt_tokens": sum(c.prompt_tokens for c in calls),
+                "completion_tokens": sum(c.completion_tokens for c in calls),
+                "cached_tokens": sum(c.cached_tokens for c in calls),
+                "cache_hit_rate": round(sum(c.cached_tokens for c in calls) /
+                                        max(1, sum(c.prompt_tokens for c in calls)), 3),
+                "cost_usd": round(sum(c.cost_usd for c in calls), 4),
+            }
+        return summary
+
+    def export_json(self, path: str) -> Path:
+        """Write the per-stage summary and raw records to a JSON file"""
+        with self._lock:
+            records = [asdict(r) for r in self.records]
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "exported_at": time.time(),
+            "summary": self.summary(),
+            "records": records
+        }, indent=2), encoding="utf-8")
+        return output
+
+    def reset(self):
+        """Forget in-memory records (the JSONL log is kept)"""
+        with self._lock:
+            self.records.clear()
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> LLMMetrics:
+    """Get the process-wide metrics collector"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = LLMMetrics()
+        return _metrics
@@ -0,0 +1,267 @@
+"""
+LLM Scheduler - Priority-Aware Rate Limiting for LLM Requests
+
+Sits in front of the LLM backend so interactive latency holds up under load:
+- Priority classes: interactive (user is waiting), background, batch
+- Request and token budgets per minute (token buckets)
+- Queued requests are granted strictly by priority, then arrival order
+- Rate-limit (429) responses pause all dispatch with exponential backoff,
+  honouring Retry-After when the provider sends it
+- Transient failures (5xx, timeouts, dropped connections) are retried by
+  the failing request alone after a short backoff, while the turn has time
+- A cancelled request leaves the queue immediately without consuming any
+  budget (see cancellation.py); one still queued when its turn's deadline
+  passes fails with TimeoutError instead of waiting on
+
+One scheduler is shared per process because provider limits are per account.
+"""
+import time
+import heapq
+import random
+import itertools
+import threading
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Callable, Optional
+from config import (
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES,
+    LLM_MAX_TRANSIENT_RETRIES
+)
+from cancellation import CancellationToken, OperationCancelled, resolve_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Scheduling classes (lower is served first)"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    BATCH = 2
+
+
+class TokenBucket:
+    """Continuously refilling budget of `per_minute` units"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an exception is a provider 429"""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Check whether an exception is a server error, request timeout or dropped connection"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status >= 500 or status in (408, 409)
+    # Connection failures and timeouts as raised by the OpenAI SDK (the built-in
+    # TimeoutError is the turn's deadline, not a failed request)
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Read Retry-After (seconds) from a provider error, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Ticket:
+    """A queued request waiting for a slot"""
+    __slots__ = ("priority", "tokens")
+
+    def __init__(self, priority: int, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+
+
+class LLMScheduler:
+    """
+    Grants LLM request slots by priority within per-minute budgets.
+
+    Usage:
+        with scheduler.slot(RequestPriority.INTERACTIVE, estimated_tokens):
+            response = backend.complete(...)
+        # or, with automatic 429 and transient-error retry:
+        response = scheduler.run(lambda: backend.complete(...), priority, tokens)
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES,
+                 max_transient_retries: int = LLM_MAX_TRANSIENT_RETRIES):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.max_transient_retries = max_transient_retries
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self._backoff = 0.0
+
+    def _acquire(self, priority: int, tokens: int, cancel_token: Optional[CancellationToken] = None):
+        ticket = _Ticket(priority, tokens)
+        unregister = cancel_token.on_cancel(self._wake_all) if cancel_token else None
+        try:
+            self._wait_for_slot(ticket, cancel_token)
+        finally:
+            if unregister:
+                unregister()
+
+    def _wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wait_for_slot(self, ticket: _Ticket, cancel_token: Optional[CancellationToken]):
+        priority, tokens = ticket.priority, ticket.tokens
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._seq), ticket))
+            while True:
+                remaining = cancel_token.remaining() if cancel_token else None
+                if cancel_token and (cancel_token.cancelled or remaining == 0):
+                    self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    if cancel_token.cancelled:
+                        raise OperationCancelled(cancel_token.reason)
+                    raise TimeoutError("Turn deadline passed while queued for an LLM slot")
+                now = time.monotonic()
+                wait = None
+                if self._queue[0][2] is ticket:
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    elif self._active < self.max_concurrency:
+                        wait = max(self.requests.time_until(1, now),
+                                   self.tokens.time_until(tokens, now))
+                        if wait <= 0:
+                            heapq.heappop(self._queue)
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            self._active += 1
+                            # Let the next ticket re-evaluate
+                            self._cond.notify_all()
+                            return
+                if remaining is not None:
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(timeout=wait)
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = RequestPriority.INTERACTIVE, tokens: int = 0,
+             cancel_token: Optional[CancellationToken] = None):
+        """Hold one dispatch slot for the duration of a request (leaves the queue if cancelled)"""
+        start = time.monotonic()
+        self._acquire(priority, tokens, resolve_token(cancel_token))
+        queued = time.monotonic() - start
+        if queued > 0.5:
+            logger.info(f"LLM request ({RequestPriority(priority).name.lower()}) queued {queued:.1f}s")
+        try:
+            yield
+        finally:
+            self._release()
+
+    def report_rate_limited(self, error: BaseException = None) -> float:
+        """Pause all dispatch after a 429; returns the pause in seconds"""
+        with self._cond:
+            self._backoff = min(60.0, self._backoff * 2 if self._backoff else 1.0)
+            delay = _retry_after(error) if error is not None else None
+            if delay is None:
+                delay = self._backoff * (1 + random.random() * 0.25)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        logger.warning(f"LLM rate limited - pausing dispatch for {delay:.1f}s")
+        return delay
+
+    def report_success(self):
+        """Reset backoff after a successful request"""
+        with self._cond:
+            self._backoff = 0.0
+
+    def retry_transient(self, error: BaseException, attempt: int,
+                        cancel_token: Optional[CancellationToken] = None) -> bool:
+        """
+        Back off before retrying a transient failure (outside any slot).
+
+        Returns:
+            False if the error is not transient, retries are used up or the
+            turn has no time left for the backoff
+        """
+        if not is_transient_error(error) or attempt >= self.max_transient_retries:
+            return False
+        delay = min(8.0, 0.5 * 2 ** attempt) * (1 + random.random() * 0.25)
+        token = resolve_token(cancel_token)
+        if token is not None and not token.has_budget(delay):
+            return False
+        logger.warning(f"Transient LLM error ({type(error).__name__}: {error}) - retrying in {delay:.1f}s")
+        if token is not None:
+            token.wait(delay)
+            token.raise_if_cancelled()
+        else:
+            time.sleep(delay)
+        return True
+
+    def run(self, fn: Callable[[], Any], priority: int = RequestPriority.INTERACTIVE, tokens: int = 0,
+            cancel_token: Optional[CancellationToken] = None) -> Any:
+        """Run fn in a slot, retrying with backoff on rate-limit and transient errors"""
+        attempt = transient_attempt = 0
+        while True:
+            try:
+                with self.slot(priority, tokens, cancel_token):
+                    result = fn()
+                self.report_success()
+                return result
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    self.report_rate_limited(e)
+                    attempt += 1
+                elif self.retry_transient(e, transient_attempt, cancel_token):
+                    transient_attempt += 1
+                else:
+                    raise
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler() -> LLMScheduler:
+    """Get the process-wide scheduler"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+        return _default_scheduler
@@ -4,9 +4,11 @@ MCP Client for Altium Designer Integration
 import requests
 import json
 import time
+import threading
 from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from config import MCP_SERVER_URL, MCP_TIMEOUT
+from cancellation import OperationCancelled, current_token
 import json
 
 
@@ -140,6 +142,62 @@ def wait_for_pcb_info(info_file: str = None, timeout: int = 20) -> bool:
     return False
 
 
+class CancellableSession(requests.Session):
+    """
+    requests.Session whose requests are abandoned when the current
+    CancellationToken is cancelled (see cancellation.py).
+
+    Under a token the request runs on a helper thread: the caller gets
+    OperationCancelled immediately, and the helper closes the connection as
+    soon as the server answers or between body chunks. Without a token this
+    is a plain Session.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def request(self, method, url, *args, **kwargs):
+        token = current_token()
+        if token is None:
+            return super().request(method, url, *args, **kwargs)
+        token.raise_if_cancelled()
+
+        kwargs["stream"] = True
+        finished = threading.Event()
+        outcome = {}
+        send = super().request
+
+        def run():
+            try:
+                response = send(method, url, *args, **kwargs)
+                try:
+                    body = bytearray()
+                    for chunk in response.iter_content(self.CHUNK_SIZE):
+                        if token.cancelled:
+                            return
+                        body.extend(chunk)
+                    response._content = bytes(body)  # Makes .json()/.text work as without stream=True
+                finally:
+                    response.close()
+                outcome["response"] = response
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                finished.set()
+
+        unregister = token.on_cancel(finished.set)
+        try:
+            threading.Thread(target=run, name="MCPRequest", daemon=True).start()
+            finished.wait()
+        finally:
+            unregister()
+        if token.cancelled:
+            # The helper thread may still be waiting on the server; don't join it
+            raise OperationCancelled(token.reason)
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["response"]
+
+
 class AltiumMCPClient:
     """Client for communicating with Altium Designer via MCP"""
     
@@ -151,7 +209,7 @@ class AltiumMCPClient:
     def __init__(self, server_url: str = None):
         self.server_url = server_url or MCP_SERVER_URL
         self.connected = False
-        self.session = requests.Session()
+        self.session = CancellableSession()  # Requests abort with the chat turn's token
         self.session.timeout = MCP_TIMEOUT
         self.active_document_type = self.DOC_PCB  # Default to PCB mode
         
@@ -536,6 +594,23 @@ class AltiumMCPClient:
             print(f"Error getting files status: {e}")
             return None
     
+    def get_document_versions(self) -> Optional[Dict[str, Optional[str]]]:
+        """Get a version string per data file (None for files not exported)"""
+        if not self.connected:
+            return None
+        
+        try:
+            response = self.session.get(
+                f"{self.server_url}/altium/files/versions",
+                timeout=MCP_TIMEOUT
+            )
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception as e:
+            print(f"Error getting document versions: {e}")
+            return None
+    
     def set_document_type(self, doc_type: str):
         """Set the active document type (PCB, SCH, PRJ)"""
         if doc_type in [self.DOC_PCB, self.DOC_SCHEMATIC, self.DOC_PROJECT]:
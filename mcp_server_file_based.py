@@ -190,6 +190,29 @@ class AltiumMCPHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json.dumps(data, default=str).encode())
     
+    def _data_files(self) -> dict:
+        """Exported data file paths by document name"""
+        return {
+            "pcb_info": self.pcb_info_path,
+            "schematic_info": self.schematic_info_path,
+            "project_info": self.project_info_path,
+            "verification_report": self.verification_report_path,
+            "output_result": self.output_result_path,
+            "design_rules": self.design_rules_path,
+            "board_config": self.board_config_path,
+            "component_search": self.component_search_path,
+            "library_list": self.library_list_path
+        }
+    
+    @staticmethod
+    def _file_version(file_path: str):
+        """Version string for a data file (None if it does not exist)"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
@@ -405,6 +428,13 @@ class AltiumMCPHandler(BaseHTTPRequestHandler):
             }
             self._send_json_response(files_status)
         
+        elif path == "/altium/files/versions":
+            # Cheap change detection: file mtime and size only, nothing is parsed
+            self._send_json_response({
+                name: self._file_version(file_path)
+                for name, file_path in self._data_files().items()
+            })
+        
         else:
             self._send_json_response({"error": "Not found"}, 404)
     
@@ -0,0 +1,103 @@
+"""
+Model Router - Per-Stage Model Selection with Latency Budgets
+
+Maps each orchestrator stage (intent, answer, command, command_response,
+analyze, strategy, review, ...) to a route from config.LLM_ROUTES:
+- model: cheap, fast models for classification and confirmation text, larger
+  models for design analysis
+- temperature: overrides the caller's value when set
+- max_latency_s: per-request budget (time to the full response)
+- first_chunk_s: budget for streamed requests (time to the first chunk);
+  max_latency_s when unset
+- fallback: model to retry with when the budget is exceeded
+
+A stage that keeps exceeding its budget is switched to its fallback for a
+cool-down period, so later calls don't wait out the timeout first.
+"""
+import time
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional
+from config import LLM_ROUTES, LLM_ROUTE_COOLDOWN_S
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Route:
+    """How one stage calls the LLM"""
+    stage: str
+    model: str
+    temperature: Optional[float] = None
+    max_latency_s: Optional[float] = None
+    first_chunk_s: Optional[float] = None
+    fallback: Optional[str] = None
+    streaming: bool = False
+
+    @property
+    def budget_key(self) -> str:
+        """Overrun counter key - streamed and complete calls have separate budgets"""
+        return f"{self.stage}:stream" if self.streaming else self.stage
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Check whether an exception is a request timeout"""
+    return "Timeout" in type(error).__name__
+
+
+class ModelRouter:
+    """
+    Resolves stages to routes and tracks budget overruns.
+
+    Usage:
+        route = router.route("intent")              # or route(stage, streaming=True)
+        ...  # call route.model with timeout=route.max_latency_s
+        router.observe(route, latency_s, timed_out)
+    """
+
+    # Consecutive overruns before a stage is switched to its fallback
+    DEGRADE_AFTER = 2
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]] = None, cooldown_s: float = LLM_ROUTE_COOLDOWN_S):
+        routes = routes if routes is not None else LLM_ROUTES
+        self.routes = {stage: Route(stage=stage, **spec) for stage, spec in routes.items()}
+        self.cooldown_s = cooldown_s
+        self._overruns: Dict[str, int] = {}
+        self._degraded_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def route(self, stage: str, streaming: bool = False) -> Route:
+        """
+        Route for a stage (the default route for unknown stages).
+        With streaming=True, max_latency_s is the time-to-first-chunk budget.
+        """
+        route = self.routes.get(stage) or replace(self.routes["default"], stage=stage)
+        if streaming:
+            route = replace(route, streaming=True,
+                            max_latency_s=route.first_chunk_s if route.first_chunk_s is not None
+                            else route.max_latency_s)
+        with self._lock:
+            degraded = self._degraded_until.get(route.budget_key, 0) > time.monotonic()
+        if degraded and route.fallback:
+            # Go straight to the fallback without a budget
+            return replace(route, model=route.fallback, max_latency_s=None, first_chunk_s=None, fallback=None)
+        return route
+
+    def observe(self, route: Route, latency_s: float, timed_out: bool = False):
+        """Record one request against its stage's budget"""
+        if not route.max_latency_s:
+            return
+        exceeded = timed_out or latency_s > route.max_latency_s
+        key = route.budget_key
+        with self._lock:
+            if not exceeded:
+                self._overruns[key] = 0
+                return
+            self._overruns[key] = self._overruns.get(key, 0) + 1
+            if self._overruns[key] >= self.DEGRADE_AFTER and route.fallback:
+                self._degraded_until[key] = time.monotonic() + self.cooldown_s
+                self._overruns[key] = 0
+                kind = "first-chunk" if route.streaming else "response"
+                logger.warning(f"Stage '{route.stage}' over its {route.max_latency_s}s {kind} budget - "
+                               f"using {route.fallback} for {self.cooldown_s:.0f}s")
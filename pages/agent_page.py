@@ -7,6 +7,8 @@ import tkinter
 from mcp_client import AltiumMCPClient
 from llm_client import LLMClient
 from agent_orchestrator import AgentOrchestrator
+from job_manager import JobEvent, JobStatus
+from cancellation import CancellationToken
 from config import WINDOW_WIDTH, WINDOW_HEIGHT
 import threading
 import re
@@ -190,6 +192,7 @@ class AgentPage(ctk.CTkFrame):
         self.messages = []
         self.is_loading = False
         self.is_destroyed = False  # Track if widget is destroyed
+        self._turn_token = None  # Cancels the running turn (stop button, leaving the page)
         self.pending_confirmation = None  # Store confirmation data
         
         # Color scheme (matching welcome page)
@@ -225,6 +228,13 @@ class AgentPage(ctk.CTkFrame):
         
         self.setup_ui()
         self.add_welcome_message()
+        
+        # Show progress of background jobs (layout, analysis, review)
+        self._unsubscribe_jobs = self.agent.jobs.subscribe(self._on_job_event) if self.agent else None
+        
+        # Connected - warm context and analysis before the first question
+        if self.agent:
+            self.agent.prefetcher.start()
     
     def setup_ui(self):
         """Setup professional UI"""
@@ -398,19 +408,43 @@ I help with project creation, design analysis, layout generation, and command ex
         self.set_loading(True)
         
         # Process in thread
-        threading.Thread(target=self.process_message, args=(text,), daemon=True).start()
+        self._turn_token = CancellationToken()
+        threading.Thread(target=self.process_message, args=(text, self._turn_token), daemon=True).start()
     
     def set_loading(self, loading: bool):
         """Set loading state"""
         self.is_loading = loading
         if loading:
-            self.send_button.configure(text="◌", state="disabled", fg_color=self.colors["text_dim"])
+            # While a turn runs the send button stops it
+            self.send_button.configure(text="■", state="normal", fg_color=self.colors["error"],
+                                       command=self.cancel_turn)
             self.input_entry.configure(state="disabled")
         else:
-            self.send_button.configure(text="→", state="normal", fg_color=self.colors["primary"])
+            self.send_button.configure(text="→", state="normal", fg_color=self.colors["primary"],
+                                       command=self.send_message)
             self.input_entry.configure(state="normal")
             self.input_entry.focus()
     
+    def _on_job_event(self, event: JobEvent):
+        """Job progress (called on the job's worker thread)"""
+        def update():
+            if event.status != JobStatus.RUNNING or not self.is_loading:
+                return
+            stage = event.stage.replace("_", " ") or "starting"
+            percent = f" {event.progress:.0%}" if event.progress is not None else ""
+            self.set_status(f"{event.name.replace('_', ' ').title()}: {stage}{percent}", "warning")
+        self._safe_after(0, update)
+    
+    def cancel_turn(self, reason: str = "stopped by user"):
+        """Stop the running turn: its LLM calls, Altium requests and background jobs"""
+        token = self._turn_token
+        if token is None or token.cancelled:
+            return
+        token.cancel(reason)
+        if not self.is_destroyed:
+            self.send_button.configure(state="disabled", fg_color=self.colors["text_dim"])
+            self.set_status("Cancelling...", "warning")
+    
     def set_status(self, text: str, status: str = "success"):
         """Update status indicator"""
         colors = {
@@ -423,7 +457,7 @@ I help with project creation, design analysis, layout generation, and command ex
         self.status_dot.configure(text_color=color)
         self.status_text.configure(text=text)
     
-    def process_message(self, text: str):
+    def process_message(self, text: str, cancel_token: CancellationToken = None):
         """Process message in background"""
         try:
             # Create streaming message
@@ -441,7 +475,8 @@ I help with project creation, design analysis, layout generation, and command ex
                     self._safe_after(0, lambda: self.chat_frame._parent_canvas.yview_moveto(1.0))
             
             # Process
-            response, status, is_exec = self.agent.process_query(text, stream_callback=on_chunk)
+            response, status, is_exec = self.agent.process_query(text, stream_callback=on_chunk,
+                                                                 cancel_token=cancel_token)
             
             # Update UI
             self._safe_after(0, lambda: self.on_response_complete(response, status, is_exec, streaming_msg))
@@ -471,6 +506,8 @@ I help with project creation, design analysis, layout generation, and command ex
             self.set_status("Waiting for confirmation", "info")
         elif status == "error":
             self.set_status("Error", "error")
+        elif status == "cancelled":
+            self.set_status("Cancelled", "info")
         elif is_exec:
             self.set_status("Command Ready", "info")
         elif status in ["analyzed", "strategy_generated", "reviewed", "layout_generated"]:
@@ -564,6 +601,7 @@ I help with project creation, design analysis, layout generation, and command ex
     
     def go_back(self):
         """Go back to project setup page"""
+        self.cancel_turn("left the chat")
         self.is_destroyed = True  # Mark as destroyed to prevent callbacks
         self.clear_chat()
         if self.on_back:
@@ -571,5 +609,10 @@ I help with project creation, design analysis, layout generation, and command ex
     
     def destroy(self):
         """Override destroy to mark as destroyed"""
+        self.cancel_turn("left the chat")
         self.is_destroyed = True
+        if self._unsubscribe_jobs:
+            self._unsubscribe_jobs()
+        if self.agent:
+            self.agent.prefetcher.stop()
         super().destroy()
@@ -0,0 +1,158 @@
+"""
+Prefetcher - Idle-Time Warmup of Design Context and Analysis
+
+Runs in the background after Altium connects and whenever a new export
+appears, so the first question doesn't pay for everything at once:
+- Context snapshot (all exported documents)
+- Context summaries and search indexes per document
+- Cheap analysis sections (component summary, signals, design type,
+  critical components)
+- Optionally LLM functional block detection, at BACKGROUND priority
+  (config.PREFETCH_LLM_BLOCKS)
+
+Everything warmed lands in the same per-version caches the chat turn uses.
+Work stops as soon as a real query pauses the prefetcher and picks up again
+(from the start, skipping what is cached) once it is idle. A step in flight
+is cancelled on pause as well as on stop(): its BACKGROUND LLM call leaves
+the scheduler queue and releases the analysis section, so a query needing
+that section computes it at its own priority instead of waiting behind it.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+from config import PREFETCH_ENABLED, PREFETCH_LLM_BLOCKS, PREFETCH_POLL_S
+from context_snapshot import ContextSnapshot
+from llm_scheduler import RequestPriority
+from cancellation import CancellationToken, OperationCancelled, use_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Analysis sections that need no LLM call
+LOCAL_ANALYSIS_SECTIONS = ("component_summary", "signal_analysis", "design_type", "critical_components")
+
+
+class Prefetcher:
+    """
+    Warms an AgentOrchestrator's caches while the user is idle.
+
+    Usage:
+        prefetcher = Prefetcher(agent)
+        prefetcher.start()            # after connect
+        with prefetcher.paused():     # around each chat turn
+            ...
+        prefetcher.stop()
+    """
+
+    def __init__(self, orchestrator, poll_s: float = PREFETCH_POLL_S, llm_blocks: bool = PREFETCH_LLM_BLOCKS):
+        self.orchestrator = orchestrator
+        self.poll_s = poll_s
+        self.llm_blocks = llm_blocks
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pauses = 0
+        self._lock = threading.Lock()
+        self._warmed: Optional[ContextSnapshot] = None
+        self._token = CancellationToken()
+        self._step_token: Optional[CancellationToken] = None  # Token of the step in flight
+
+    def start(self):
+        """Start warming in the background (no-op if disabled or running)"""
+        if not PREFETCH_ENABLED or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._token = CancellationToken()
+        self._thread = threading.Thread(target=self._run, name="Prefetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._token.cancel("prefetcher stopped")
+        self._stop.set()
+        self._wake.set()
+        self._idle.set()
+
+    def pause(self):
+        """A query needs the resources - cancel the step in flight and stop"""
+        with self._lock:
+            self._pauses += 1
+            self._idle.clear()
+            step_token = self._step_token
+        if step_token is not None:
+            step_token.cancel("prefetch paused for a query")
+
+    def resume(self):
+        """Idle again - re-check for a new export right away"""
+        with self._lock:
+            self._pauses = max(0, self._pauses - 1)
+            if self._pauses == 0:
+                self._idle.set()
+                self._wake.set()
+
+    @contextmanager
+    def paused(self):
+        self.pause()
+        try:
+            yield
+        finally:
+            self.resume()
+
+    def _interrupted(self) -> bool:
+        return self._stop.is_set() or not self._idle.is_set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._idle.wait()
+            if self._stop.is_set():
+                return
+            try:
+                snapshot = self.orchestrator.context_provider.current()
+                if snapshot and snapshot is not self._warmed and self._warm(snapshot):
+                    self._warmed = snapshot
+            except OperationCancelled:
+                return
+            except Exception as e:
+                logger.error(f"Prefetch failed: {e}")
+            self._wake.wait(self.poll_s)
+            self._wake.clear()
+
+    def _steps(self, snapshot: ContextSnapshot) -> List[Tuple[str, Callable[[], object]]]:
+        agent = self.orchestrator
+        steps = [("context", lambda: agent._get_all_context(snapshot))]
+        for name in ("pcb_info", "schematic_info"):
+            if snapshot.get(name):
+                steps.append((f"{name} index", lambda name=name: agent._design_index(snapshot, name)))
+
+        if snapshot.get("schematic_info"):
+            def analysis():
+                agent._load_design_analyzer(snapshot)
+                return agent.design_analyzer.analyze_schematic(priority=RequestPriority.BACKGROUND)
+            for section in LOCAL_ANALYSIS_SECTIONS:
+                steps.append((section, lambda section=section: analysis()[section]))
+            if self.llm_blocks:
+                steps.append(("functional_blocks", lambda: analysis()["functional_blocks"]))
+        return steps
+
+    def _warm(self, snapshot: ContextSnapshot) -> bool:
+        """Run the warmup steps; False if interrupted by a query"""
+        for name, step in self._steps(snapshot):
+            with self._lock:  # A pause either happens before this check or cancels the step
+                if self._interrupted():
+                    logger.info(f"Prefetch interrupted before {name}")
+                    return False
+                self._step_token = CancellationToken(self._token)
+            try:
+                with use_token(self._step_token):
+                    step()
+            except OperationCancelled:
+                if self._token.cancelled:
+                    raise  # Stopped
+                logger.info(f"Prefetch of {name} cancelled for a query")
+                return False
+            finally:
+                with self._lock:
+                    self._step_token = None
+        logger.info(f"Prefetched {snapshot!r}")
+        return True
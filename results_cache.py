@@ -0,0 +1,179 @@
+"""
+Results Cache - Content-Hash Keyed Persistent Cache of Design Results
+
+Analysis sections, placement strategies, layouts and constraints are stored
+on disk under a canonical hash of the inputs they were computed from
+(components, nets, board size, generator settings, ...), so reopening an
+unchanged design reuses them across sessions and only changed inputs are
+recomputed:
+- Keys: SHA-256 of the inputs serialized as canonical JSON (sorted keys)
+- One JSON file per result under <cache dir>/<kind>/
+- Least recently used entries are evicted once the cache exceeds its size
+
+Values must be JSON-serializable; callers convert dataclasses themselves.
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+from config import RESULTS_CACHE_DIR, RESULTS_CACHE_MAX_MB
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached results changes
+CACHE_FORMAT_VERSION = 1
+
+_MISSING = object()
+
+
+def canonical_hash(*inputs: Any) -> str:
+    """Stable hash of JSON-like inputs (dict key order does not matter)"""
+    payload = json.dumps([CACHE_FORMAT_VERSION, *inputs], sort_keys=True, separators=(",", ":"),
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultsCache:
+    """
+    Size-bounded on-disk cache of computed results.
+
+    Usage:
+        cache = get_results_cache()
+        key = canonical_hash(components, nets)
+        blocks = cache.get_or_compute("functional_blocks", key, detect_blocks)
+    """
+
+    def __init__(self, cache_dir: Optional[str] = RESULTS_CACHE_DIR, max_bytes: int = RESULTS_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else None  # None disables the cache
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # Bytes on disk, counted on first write
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_dir is not None
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.cache_dir / kind / f"{key}.json"
+
+    def get(self, kind: str, key: str, default: Any = None) -> Any:
+        """Cached value, or default on a miss"""
+        if not self.enabled:
+            return default
+        path = self._path(kind, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Unreadable cache entry {path}: {e}")
+            return default
+        try:
+            os.utime(path)  # Recently used - evicted last
+        except OSError:
+            pass
+        return value
+
+    def put(self, kind: str, key: str, value: Any):
+        """Store a value, evicting old entries if the cache is over its size"""
+        if not self.enabled:
+            return
+        path = self._path(kind, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = json.dumps(value, ensure_ascii=False, default=str)
+            temp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            temp.write_text(data, encoding="utf-8")
+            os.replace(temp, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Could not cache {kind} result: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data.encode("utf-8"))
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_or_compute(self, kind: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Cached value, or compute and store it (None results are not stored)"""
+        value = self.get(kind, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(kind, key, value)
+        return value
+
+    def clear(self):
+        """Delete every cached result"""
+        with self._lock:
+            for path in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._size = 0
+
+    def _entries(self):
+        return self.cache_dir.glob("*/*.json") if self.enabled and self.cache_dir.exists() else []
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self):
+        """Remove least recently used entries until 80% of the size limit"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                pass  # Removed by another process
+        entries.sort()
+        size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+                size -= entry_size
+                removed += 1
+            except OSError:
+                pass
+        self._size = size
+        logger.info(f"Results cache: evicted {removed} entries ({size / 1024 / 1024:.1f} MB kept)")
+
+
+_default_cache: Optional[ResultsCache] = None
+_default_lock = threading.Lock()
+
+
+def get_results_cache() -> ResultsCache:
+    """Get the process-wide results cache"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultsCache()
+        return _default_cache
+
+
+def set_results_cache(cache: ResultsCache):
+    """Replace the process-wide results cache (e.g. a disabled one for fresh runs)"""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
@@ -0,0 +1,209 @@
+"""
+Single Flight - Coalescing of Identical In-Flight Requests
+
+When several callers ask for the same thing at the same time (a double-sent
+message, a background prefetch racing a foreground query), only one
+underlying call is made:
+- do(): callers with the same key wait on one call and share its result
+- stream(): one underlying stream is pumped in a background thread and its
+  chunks are fanned out to every caller, including late joiners
+
+Keys are forgotten as soon as the call finishes; this is deduplication of
+concurrent work, not a cache.
+
+A caller whose CancellationToken is cancelled stops waiting immediately; the
+shared call keeps running for the others and is only aborted (stream closed)
+once nobody is left. Callers still interested in a call whose leader was
+cancelled run it again themselves.
+"""
+import threading
+from typing import Dict, Any, Callable, Iterator, Iterable, Optional
+from cancellation import CancellationToken, OperationCancelled, resolve_token, use_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A blocking call shared by all waiters"""
+
+    def __init__(self):
+        self.finished = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self.cond = threading.Condition()
+
+
+class _StreamCall:
+    """A stream shared by all subscribers"""
+
+    def __init__(self, timeout_s: Optional[float] = None):
+        self.chunks = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cond = threading.Condition()
+        # Aborts the underlying stream once abandoned; carries the first caller's deadline
+        self.token = CancellationToken(timeout_s=timeout_s)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+
+    Usage:
+        flight = SingleFlight()
+        result = flight.do(key, lambda: expensive_call())
+        for chunk in flight.stream(key, lambda: expensive_stream()):
+            ...
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], cancel_token: Optional[CancellationToken] = None) -> Any:
+        """Run fn once for all concurrent callers with the same key"""
+        token = resolve_token(cancel_token)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            call.waiters += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                with call.cond:
+                    call.finished = True
+                    call.cond.notify_all()
+            if call.waiters > 1:
+                logger.info(f"Single-flight: shared one call between {call.waiters} callers")
+        else:
+            self._wait(call, token)
+            if isinstance(call.error, OperationCancelled):
+                # The leader gave up, this caller didn't
+                return self.do(key, fn, cancel_token)
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _wait(self, call: _Call, token: Optional[CancellationToken]):
+        """Wait for the leader's result unless this caller is cancelled first"""
+        def wake():
+            with call.cond:
+                call.cond.notify_all()
+        unregister = token.on_cancel(wake) if token else None
+        try:
+            with call.cond:
+                while not call.finished:
+                    if token:
+                        token.raise_if_cancelled()
+                    call.cond.wait()
+        finally:
+            if unregister:
+                unregister()
+
+    def stream(self, key: str, fn: Callable[[], Iterable[Any]],
+               cancel_token: Optional[CancellationToken] = None) -> Iterator[Any]:
+        """
+        Pump fn()'s iterator once and yield every chunk to each concurrent caller.
+        fn runs under the shared call's own token, cancelled when every caller has left.
+        """
+        token = resolve_token(cancel_token)
+        with self._lock:
+            call = self._streams.get(key)
+            if call is None:
+                call = _StreamCall(token.remaining() if token else None)
+                self._streams[key] = call
+                threading.Thread(
+                    target=self._pump,
+                    args=(key, call, fn),
+                    name="SingleFlightStream",
+                    daemon=True
+                ).start()
+            with call.cond:
+                call.subscribers += 1
+
+        return self._subscribe(key, call, token)
+
+    def _pump(self, key: str, call: _StreamCall, fn: Callable[[], Iterable[Any]]):
+        """Read the underlying stream and publish chunks to subscribers"""
+        source = None
+        try:
+            with use_token(call.token):
+                source = iter(fn())
+                for chunk in source:
+                    with call.cond:
+                        call.chunks.append(chunk)
+                        call.cond.notify_all()
+                        abandoned = call.subscribers == 0
+                    if abandoned and self._abandon(key, call):
+                        # Everyone stopped listening - stop paying for tokens
+                        break
+        except BaseException as e:
+            call.error = e
+        finally:
+            if source is not None and hasattr(source, "close"):
+                try:
+                    source.close()
+                except BaseException as e:
+                    logger.error(f"Closing abandoned stream failed: {e}")
+            with self._lock:
+                if self._streams.get(key) is call:
+                    del self._streams[key]
+            with call.cond:
+                call.finished = True
+                call.cond.notify_all()
+
+    def _abandon(self, key: str, call: _StreamCall) -> bool:
+        """Retire a stream nobody listens to, unless a new caller just joined"""
+        with self._lock:
+            with call.cond:
+                if call.subscribers:
+                    return False
+            if self._streams.get(key) is call:
+                del self._streams[key]
+            return True
+
+    def _subscribe(self, key: str, call: _StreamCall, token: Optional[CancellationToken]) -> Iterator[Any]:
+        """Yield all chunks of a shared stream from the beginning"""
+        def wake():
+            with call.cond:
+                call.cond.notify_all()
+        unregister = token.on_cancel(wake) if token else None
+        index = 0
+        try:
+            while True:
+                with call.cond:
+                    while index >= len(call.chunks) and not call.finished:
+                        if token:
+                            token.raise_if_cancelled()
+                        call.cond.wait()
+                    if index < len(call.chunks):
+                        chunk = call.chunks[index]
+                    elif call.error is not None:
+                        raise call.error
+                    else:
+                        return
+                index += 1
+                yield chunk
+        finally:
+            if unregister:
+                unregister()
+            with call.cond:
+                call.subscribers -= 1
+                abandoned = call.subscribers == 0 and not call.finished
+            if abandoned and self._abandon(key, call):
+                # Don't wait for the next chunk to notice - close the stream now
+                call.token.cancel("abandoned")
@@ -0,0 +1,131 @@
+"""
+Stage Graph - Demand-Driven, Concurrent Pipeline Stages
+
+Expresses a multi-step pipeline (e.g. schematic -> layout) as named stages
+with explicit dependencies:
+- Only the stages the requested outputs depend on are run
+- Stages whose dependencies are complete run concurrently on a thread pool
+- Each stage's wall time is recorded for logging
+
+A failing stage (or on_stage callback) cancels everything not yet started
+and re-raises. Stages run in a copy of the caller's context, so they see the
+turn's CancellationToken; no new stage starts once it is cancelled.
+"""
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Tuple, List, Set, Optional
+from cancellation import current_token
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step; func is called with the results of deps, in order"""
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages.
+
+    Usage:
+        graph = StageGraph()
+        graph.add("signals", lambda: analyze(nets))
+        graph.add("placement", lambda: place(components))
+        graph.add("constraints", make_constraints, deps=("signals",))
+        results = graph.run("placement", "constraints")
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, float] = {}
+
+    def add(self, name: str, func: Callable[..., Any], deps: Tuple[str, ...] = ()):
+        """Register a stage (dependencies may be added later, before run)"""
+        self.stages[name] = Stage(name, func, tuple(deps))
+
+    def _required(self, targets: Tuple[str, ...]) -> Set[str]:
+        """Targets plus everything they transitively depend on"""
+        required: Set[str] = set()
+        visiting: Set[str] = set()
+
+        def visit(name: str):
+            if name in required:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage dependency cycle through '{name}'")
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            required.add(name)
+
+        for target in targets:
+            visit(target)
+        return required
+
+    def _timed(self, stage: Stage, args: List[Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return stage.func(*args)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - start
+
+    def run(self, *targets: str, on_stage: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Run the stages needed for targets (all stages if none given).
+
+        Args:
+            on_stage: Optional callback (name, finished, total) after each stage;
+                an exception raised from it (e.g. cancellation) stops the graph
+
+        Returns:
+            Results of every stage that ran, by name
+        """
+        pending = self._required(targets or tuple(self.stages))
+        total = len(pending)
+        results: Dict[str, Any] = {}
+        self.timings = {}
+        token = current_token()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="Stage") as pool:
+            running = {}
+            try:
+                while pending or running:
+                    if token:
+                        token.raise_if_cancelled()
+                    for name in sorted(pending):
+                        stage = self.stages[name]
+                        if all(dep in results for dep in stage.deps):
+                            args = [results[dep] for dep in stage.deps]
+                            context = contextvars.copy_context()
+                            running[pool.submit(context.run, self._timed, stage, args)] = name
+                            pending.discard(name)
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            results[name] = future.result()
+                        except Exception:
+                            logger.error(f"Stage '{name}' failed")
+                            raise
+                        if on_stage:
+                            on_stage(name, len(results), total)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+        logger.info("Stages: " + ", ".join(f"{name} {seconds * 1000:.0f}ms"
+                                            for name, seconds in self.timings.items()))
+        return results
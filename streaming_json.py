@@ -0,0 +1,175 @@
+"""
+Streaming JSON - Incremental Parsing of Structured LLM Output
+
+This module extracts JSON from LLM responses while they stream:
+- Skips prose (including prose that contains braces) around the JSON
+- Emits each element of selected arrays ("blocks", "board_zones", ...)
+  as soon as its object closes, before the completion ends
+- Returns the complete top-level object once it closes
+- finish() at the end of the stream rescans past a "{" in prose that never
+  closed; items are emitted once even when a rescan passes them again
+
+Replaces greedy re.search(r'\\{[\\s\\S]*\\}') extraction, which waits for
+the full response and breaks when prose contains braces.
+"""
+import json
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+
+
+class StreamingJSONParser:
+    """
+    Incremental JSON object scanner.
+
+    Usage:
+        parser = StreamingJSONParser(["blocks"])
+        for chunk in llm_client.chat_stream(messages):
+            for key, item in parser.feed(chunk):
+                handle(key, item)
+        for key, item in parser.finish():
+            handle(key, item)
+        result = parser.result
+    """
+
+    def __init__(self, array_keys: Iterable[str] = ()):
+        self.array_keys = set(array_keys)
+        self.buffer = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._emitted: Set[Tuple[int, int]] = set()  # Buffer spans of emitted items
+        self._reset_candidate()
+
+    def _reset_candidate(self):
+        """Forget the current candidate object and go back to skipping prose"""
+        self._stack: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._root_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Feed the next chunk of text.
+
+        Returns:
+            List of (array_key, item) pairs completed by this chunk
+        """
+        if not chunk or self.result is not None:
+            return []
+
+        self.buffer += chunk
+        return self._scan()
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """
+        Signal the end of input. A candidate still open is an unmatched "{"
+        in prose, so scanning restarts after it.
+
+        Returns:
+            List of (array_key, item) pairs found by the rescan
+        """
+        completed = []
+        while self.result is None and self._root_start is not None:
+            self._restart_after(self._root_start)
+            completed.extend(self._scan())
+        return completed
+
+    def _scan(self) -> List[Tuple[str, Any]]:
+        """Scan the buffer from the current position"""
+        completed = []
+
+        while self._pos < len(self.buffer) and self.result is None:
+            i = self._pos
+            ch = self.buffer[i]
+            self._pos += 1
+
+            if self._root_start is None:
+                # Skipping prose until an object starts
+                if ch == "{":
+                    self._root_start = i
+                    self._stack.append({"type": "{", "key": None, "start": i,
+                                        "last_key": None, "expect_key": True})
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(i)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                parent = self._stack[-1]
+                key = parent["last_key"] if parent["type"] == "{" else parent["key"]
+                self._stack.append({"type": ch, "key": key, "start": i,
+                                    "last_key": None, "expect_key": ch == "{"})
+            elif ch in "}]":
+                completed.extend(self._on_close(ch, i))
+            elif ch == ":":
+                self._stack[-1]["expect_key"] = False
+            elif ch == ",":
+                if self._stack[-1]["type"] == "{":
+                    self._stack[-1]["expect_key"] = True
+
+        return completed
+
+    def _on_string_end(self, end: int):
+        """Record object keys as they are read"""
+        frame = self._stack[-1]
+        if frame["type"] == "{" and frame["expect_key"]:
+            try:
+                frame["last_key"] = json.loads(self.buffer[self._string_start:end + 1])
+            except ValueError:
+                frame["last_key"] = None
+
+    def _on_close(self, ch: str, end: int) -> List[Tuple[str, Any]]:
+        """Handle a closing bracket; emit items and detect the end of the root"""
+        frame = self._stack[-1]
+        if (ch == "}") != (frame["type"] == "{"):
+            # Mismatched bracket - this was prose, not JSON
+            self._restart_after(self._root_start)
+            return []
+
+        self._stack.pop()
+        text = self.buffer[frame["start"]:end + 1]
+
+        if not self._stack:
+            # Root object closed
+            try:
+                self.result = json.loads(text)
+            except ValueError:
+                self._restart_after(frame["start"])
+            return []
+
+        parent = self._stack[-1]
+        if ch == "}" and parent["type"] == "[" and parent["key"] in self.array_keys:
+            span = (frame["start"], end)
+            if span in self._emitted:
+                return []  # Already emitted before a rescan
+            try:
+                item = json.loads(text)
+            except ValueError:
+                return []
+            self._emitted.add(span)
+            return [(parent["key"], item)]
+        return []
+
+    def _restart_after(self, start: int):
+        """Discard a failed candidate and rescan from the character after its start"""
+        self._reset_candidate()
+        self._pos = start + 1
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the first complete JSON object from a (possibly prose-wrapped) response"""
+    if not text:
+        return None
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    parser.finish()
+    return parser.result
@@ -0,0 +1,19 @@
+from context_packer import ContextPacker, ContextPriority, estimate_tokens, fit_items
+
+
+def test_long_single_line_query_is_truncated_not_dropped():
+    query = "User query: " + "why is the 3V3 rail noisy near U1 " * 50
+    packer = ContextPacker(40)
+    packer.add("query", query, ContextPriority.QUERY)
+    prompt = packer.pack()
+    assert prompt.startswith("User query: why is")
+    assert prompt.endswith("...")
+    assert packer.used_tokens <= 40
+
+
+def test_more_marker_counts_against_budget():
+    items = [f"R{i}" for i in range(1, 200)]
+    for budget in range(8, 60):
+        text = fit_items(items, budget)
+        assert "more)" in text
+        assert estimate_tokens(text) <= budget
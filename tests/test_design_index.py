@@ -0,0 +1,34 @@
+from design_index import DesignIndex
+
+
+def make_index():
+    components = [{"name": f"R{i}", "value": "10k", "footprint": "R0402"} for i in range(1, 10001)]
+    components += [
+        {"name": "U1", "value": "STM32F103C8T6", "footprint": "LQFP48"},
+        {"name": "U2", "value": "LM317", "footprint": "SOT223"},
+    ]
+    nets = [{"name": "USB_DP"}, {"name": "USB_DM"}, {"name": "VCC_3V3"}]
+    return DesignIndex.from_document({"components": components, "nets": nets})
+
+
+def names(entities):
+    return [e.name for e in entities]
+
+
+def test_partial_part_value_matches_by_prefix():
+    index = make_index()
+    assert names(index.search("STM32 pins")) == ["U1"]
+    assert names(index.search("what does the STM32F103 connect to")) == ["U1"]
+
+
+def test_designators_match_exactly():
+    index = make_index()
+    assert names(index.search("where is R9992?")) == ["R9992"]
+    assert names(index.search("where is R99999?")) == []
+    assert names(index.search("where is R0?")) == []  # No prefix match to R0402 or R01...
+
+
+def test_separators_are_normalised():
+    index = make_index()
+    assert names(index.search("trace width of USB DP")) == ["USB_DP"]
+    assert names(index.search("is usb_dm routed")) == ["USB_DM"]
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from llm_client import LLMClient
+from llm_scheduler import LLMScheduler
+from model_router import ModelRouter
+
+
+class SlowBackend:
+    """Answers "prompt N" with "reply N"; earlier prompts take longer"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def complete(self, model, messages, temperature, usage=None, timeout=None):
+        index = int(messages[-1]["content"].split()[-1])
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05 * (5 - index))
+        with self.lock:
+            self.active -= 1
+        return f"reply {index}"
+
+
+def make_client(backend):
+    return LLMClient(backend=backend, scheduler=LLMScheduler(max_concurrency=8), router=ModelRouter())
+
+
+def test_gather_chats_keeps_input_order():
+    backend = SlowBackend()
+    client = make_client(backend)
+    requests = [[{"role": "user", "content": f"prompt {i}"}] for i in range(5)]
+    requests[2] = {"messages": requests[2], "temperature": 0.1}
+
+    start = time.perf_counter()
+    replies = client.gather_chats(requests, max_concurrency=5)
+    elapsed = time.perf_counter() - start
+
+    assert replies == [f"reply {i}" for i in range(5)]
+    assert backend.peak > 1
+    assert elapsed < 0.45  # Slowest prompt (0.25s), not the sum (0.75s)
+
+
+def test_gather_chats_respects_max_concurrency():
+    backend = SlowBackend()
+    client = make_client(backend)
+    requests = [[{"role": "user", "content": f"prompt {i}"}] for i in range(5)]
+
+    assert client.gather_chats(requests, max_concurrency=2) == [f"reply {i}" for i in range(5)]
+    assert backend.peak <= 2
+
+
+def test_gather_chats_empty():
+    assert make_client(SlowBackend()).gather_chats([]) == []